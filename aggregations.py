@@ -0,0 +1,151 @@
+"""
+AEGIS Aggregations
+Vectorized server-side summaries that keep chart payloads small
+"""
+
+import numpy as np
+
+
+def _edges(values, bins):
+    """Return evenly spaced bin edges covering values, widening a zero-width range."""
+    if len(values) == 0:
+        return np.linspace(0.0, 1.0, bins + 1)
+    low, high = float(values.min()), float(values.max())
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def _bin_positions(values, edges):
+    """Return the bin of each value for evenly spaced edges; the last bin is closed on the right."""
+    bins = len(edges) - 1
+    scaled = (values - edges[0]) * (bins / (edges[-1] - edges[0]))
+    return np.clip(scaled.astype(np.int64), 0, bins - 1)
+
+
+def density_grid(x, y, bins=100, scores=None, top_k=3):
+    """Bin points into a 2D count grid and find the top-scoring points of each cell.
+
+    Returns a dict with 'counts' (shape y_bins x x_bins, as plotted by a
+    heatmap), bin 'x_edges' / 'y_edges', and 'top_rows': for each non-empty
+    cell, (y_bin, x_bin, positions of its top_k points by score, highest first).
+    Positions index into the input arrays.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x_edges = _edges(x, bins)
+    y_edges = _edges(y, bins)
+
+    x_bin = _bin_positions(x, x_edges)
+    y_bin = _bin_positions(y, y_edges)
+    cell = y_bin * bins + x_bin
+    counts = np.bincount(cell, minlength=bins * bins).reshape(bins, bins)
+
+    top_rows = []
+    if top_k > 0 and len(cell):
+        scores = y if scores is None else np.asarray(scores, dtype=float)
+        # Descending score first, then a stable sort by cell keeps that order within cells
+        by_score = np.argsort(-np.nan_to_num(scores, nan=-np.inf))
+        order = by_score[np.argsort(cell[by_score], kind='stable')]
+        sorted_cells = cell[order]
+        starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        for start, end in zip(starts, ends):
+            c = int(sorted_cells[start])
+            top_rows.append((c // bins, c % bins, order[start:min(end, start + top_k)]))
+
+    return {'counts': counts, 'x_edges': x_edges, 'y_edges': y_edges, 'top_rows': top_rows}
+
+
+def nice_bin_edges(values, nbins=15):
+    """Return bin edges of a round size giving roughly nbins bins, like plotly's autobin."""
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.linspace(0.0, 1.0, nbins + 1)
+    low, high = float(values.min()), float(values.max())
+    if low == high:
+        return np.array([low - 0.5, high + 0.5])
+
+    rough = (high - low) / nbins
+    base = 10 ** np.floor(np.log10(rough))
+    size = base * next(step for step in (1, 2, 5, 10) if base * step >= rough)
+
+    start = np.floor(low / size) * size
+    # Center integer data in integer-sized bins instead of putting it on the edges
+    if size >= 1 and size == int(size) and np.all(values == np.round(values)):
+        start -= 0.5
+    count = int(np.floor((high - start) / size)) + 1
+    return start + size * np.arange(count + 1)
+
+
+def grouped_histogram(values, group_codes, n_groups, edges):
+    """Count values per (group, bin); returns an n_groups x bins array."""
+    values = np.asarray(values, dtype=float)
+    bins = len(edges) - 1
+    positions = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, bins - 1)
+    counts = np.bincount(group_codes * bins + positions, minlength=n_groups * bins)
+    return counts.reshape(n_groups, bins)
+
+
+def grouped_box_stats(values, group_codes, n_groups, max_outliers=200):
+    """Compute box plot statistics per group with linear-interpolated quartiles.
+
+    Returns a dict of per-group arrays ('count', 'q1', 'median', 'q3',
+    'lowerfence', 'upperfence') and 'outliers', a list with the values beyond
+    the 1.5 IQR fences of each group. At most max_outliers of the most extreme
+    outliers are kept per group so the payload does not grow with the data.
+    """
+    values = np.asarray(values, dtype=float)
+    group_codes = np.asarray(group_codes)
+
+    order = np.lexsort((values, group_codes))
+    sorted_values = values[order]
+    counts = np.bincount(group_codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+
+    def quantile(p):
+        result = np.full(n_groups, np.nan)
+        pos = starts[present] + p * (counts[present] - 1)
+        lower = np.floor(pos).astype(np.int64)
+        upper = np.minimum(lower + 1, starts[present] + counts[present] - 1)
+        frac = pos - lower
+        result[present] = sorted_values[lower] * (1 - frac) + sorted_values[upper] * frac
+        return result
+
+    q1, median, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+    iqr = q3 - q1
+
+    # Fences are the most extreme values still within 1.5 IQR of the box
+    group_of_sorted = group_codes[order]
+    index = np.arange(len(sorted_values))
+    inside_low = sorted_values >= (q1 - 1.5 * iqr)[group_of_sorted]
+    inside_high = sorted_values <= (q3 + 1.5 * iqr)[group_of_sorted]
+    lowerfence = np.full(n_groups, np.nan)
+    upperfence = np.full(n_groups, np.nan)
+    outliers = [np.empty(0) for _ in range(n_groups)]
+    if len(sorted_values):
+        reduce_starts = starts[present]
+        first_in = np.minimum.reduceat(np.where(inside_low, index, len(index)), reduce_starts)
+        last_in = np.maximum.reduceat(np.where(inside_high, index, -1), reduce_starts)
+        lowerfence[present] = sorted_values[first_in]
+        upperfence[present] = sorted_values[last_in]
+
+        half = max_outliers // 2
+        for group, start, end, lo, hi in zip(
+            np.flatnonzero(present), reduce_starts, reduce_starts + counts[present], first_in, last_in
+        ):
+            # Values are sorted, so outliers are a prefix and a suffix of the group
+            low_out = sorted_values[start:lo][:half]
+            high_out = sorted_values[hi + 1:end][-half:] if half else np.empty(0)
+            outliers[group] = np.concatenate((low_out, high_out))
+
+    return {
+        'count': counts,
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': lowerfence,
+        'upperfence': upperfence,
+        'outliers': outliers,
+    }
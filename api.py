@@ -0,0 +1,427 @@
+"""
+AEGIS HTTP API
+Filtered rows, aggregates, and chart-ready series as JSON, NDJSON, or Arrow IPC
+
+Endpoints (under API_PREFIX, default /api):
+    GET /version   dataset version, row count, and fields
+    GET /rows      filtered rows as NDJSON (default) or an Arrow IPC stream
+    GET /summary   count, sum, mean, min, and max of every numeric field, optionally per group
+    GET /series    chart-ready bar, histogram, or scatter series
+    GET /export    filtered rows as a Parquet, Arrow, or CSV file download
+
+Filters are query parameters: departments, categories, and priorities take
+comma-separated values (all when omitted), max_budget and min_roi numbers.
+Responses carry an ETag built from the dataset version, the filters, and the
+request parameters, and answer a matching If-None-Match with 304.
+
+Reactive timings are served on a separate local listener (metrics.py), not
+here. GET/POST /admin/profiling reads
+or toggles profiling (profiling.py); it needs ADMIN_TOKEN and is disabled
+when no token is set.
+"""
+
+import hashlib
+import hmac
+import json
+import math
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from config import (
+    API_PREFIX, API_CHUNK_ROWS, API_SERIES_POINTS, BASE_SCHEMA,
+    NUMERIC_FIELDS, CATEGORICAL_FIELDS, COLOR_OPTIONS, ADMIN_TOKEN
+)
+
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+LIST_FILTERS = ("departments", "categories", "priorities")
+AGGREGATIONS = ("sum", "mean", "count")
+SERIES_KINDS = ("auto", "bar", "histogram", "scatter")
+
+
+class APIError(Exception):
+    """A request the API cannot serve; returned as a JSON error with the given status."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_filters(params):
+    """Return filter_base_data arguments from query parameters; omitted filters select everything."""
+    filters = {
+        key: [value for value in params.get(key, "").split(",") if value]
+        for key in LIST_FILTERS
+    }
+    for key, default in (("max_budget", float("inf")), ("min_roi", float("-inf"))):
+        if key not in params:
+            filters[key] = default
+            continue
+        try:
+            filters[key] = float(params[key])
+        except ValueError:
+            raise APIError(f"{key} must be a number")
+        if not math.isfinite(filters[key]):
+            raise APIError(f"{key} must be a finite number")
+    return filters
+
+
+def _int_param(params, key, default, minimum=0):
+    """Read a non-negative integer query parameter."""
+    try:
+        value = int(params.get(key, default))
+    except ValueError:
+        raise APIError(f"{key} must be an integer")
+    if value < minimum:
+        raise APIError(f"{key} must be at least {minimum}")
+    return value
+
+
+def _choice_param(params, key, choices, default):
+    """Read a query parameter that must be one of a fixed set of values."""
+    value = params.get(key, default)
+    if value not in choices:
+        raise APIError(f"{key} must be one of: {', '.join(str(c) for c in choices)}")
+    return value
+
+
+def make_etag(version, filters, *parts):
+    """Return a strong ETag for a dataset version, normalized filters, and request parameters."""
+    from utils import filter_key
+
+    key = (version, filter_key(**filters), parts)
+    return '"' + hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest() + '"'
+
+
+def _not_modified(request, etag):
+    """Return a 304 response when the client already holds this ETag, else None."""
+    held = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in held.split(",")] or held.strip() == "*":
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def _json_safe(value):
+    """Return a copy of a payload with NaN and infinite floats replaced by None."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+def _json_response(payload, etag):
+    """Serialize a payload as strict JSON (NaN and infinities become null)."""
+    return Response(
+        json.dumps(_json_safe(payload), allow_nan=False, separators=(",", ":")),
+        media_type=JSON_MEDIA_TYPE,
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+
+def _clean(values):
+    """Convert an array to a JSON-safe list with missing values as None."""
+    import numpy as np
+
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        return [None if v != v else v for v in values.tolist()]
+    return values.tolist()
+
+
+def _handler(compute):
+    """Wrap an endpoint: validate, answer If-None-Match, and run the work off the event loop.
+
+    compute(request, filters) returns (ETag parts, function building the response).
+    """
+    async def endpoint(request):
+        from data import get_versioned_base_data
+
+        try:
+            filters = parse_filters(request.query_params)
+            parts, build = compute(request, filters)
+            version, _ = await run_in_threadpool(get_versioned_base_data)
+            etag = make_etag(version, filters, request.url.path, *parts)
+            cached = _not_modified(request, etag)
+            if cached is not None:
+                return cached
+            return await run_in_threadpool(build, etag)
+        except APIError as e:
+            return Response(json.dumps({'error': str(e)}), status_code=e.status_code, media_type=JSON_MEDIA_TYPE)
+
+    return endpoint
+
+
+def _selection(filters):
+    """Filter the base data through the shared filter cache and indexes."""
+    from utils import filter_base_data
+
+    return filter_base_data(**filters)
+
+
+def _version_endpoint(request, filters):
+    def build(etag):
+        from data import get_versioned_base_data
+
+        version, df = get_versioned_base_data()
+        return _json_response({
+            'dataset_version': version,
+            'rows': len(df),
+            'fields': list(df.columns),
+            'numeric_fields': NUMERIC_FIELDS,
+            'categorical_fields': CATEGORICAL_FIELDS,
+        }, etag)
+    return (), build
+
+
+def _rows_endpoint(request, filters):
+    params = request.query_params
+    # Without a format parameter, an Accept header asking for Arrow selects it
+    default = "arrow" if ARROW_MEDIA_TYPE in request.headers.get("accept", "") else "ndjson"
+    fmt = _choice_param(params, "format", ("ndjson", "arrow"), default)
+    fields = list(dict.fromkeys(f for f in params.get("fields", "").split(",") if f))
+    unknown = [f for f in fields if f not in BASE_SCHEMA and f not in NUMERIC_FIELDS]
+    if unknown:
+        raise APIError(f"Unknown fields: {', '.join(unknown)}")
+    offset = _int_param(params, "offset", 0)
+    limit = _int_param(params, "limit", 0)
+
+    def build(etag):
+        df = _selection(filters)
+        # X-Total-Rows counts every matching row, not just this page
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Total-Rows": str(len(df))}
+        stop = offset + limit if limit else None
+        df = df.iloc[offset:stop]
+        df = df[fields] if fields else df
+        if fmt == "arrow":
+            return StreamingResponse(_arrow_chunks(df), media_type=ARROW_MEDIA_TYPE, headers=headers)
+        return StreamingResponse(_ndjson_chunks(df), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+    return (fmt, tuple(fields), offset, limit), build
+
+
+def _ndjson_chunks(df):
+    """Yield a frame as NDJSON, API_CHUNK_ROWS records at a time."""
+    for start in range(0, len(df), API_CHUNK_ROWS):
+        chunk = df.iloc[start:start + API_CHUNK_ROWS].to_json(orient="records", lines=True)
+        yield chunk if chunk.endswith("\n") else chunk + "\n"
+
+
+def _arrow_chunks(df):
+    """Yield a frame as an Arrow IPC stream, one record batch of up to API_CHUNK_ROWS rows at a time."""
+    import pyarrow as pa
+    from export import ChunkSink
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = ChunkSink()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=API_CHUNK_ROWS):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _export_endpoint(request, filters):
+    from export import EXPORT_FORMATS, export_filename, iter_export, resolve_format
+
+    fmt = resolve_format(_choice_param(request.query_params, "format", tuple(EXPORT_FORMATS), "parquet"))
+
+    def build(etag):
+        df = _selection(filters)
+        filename = export_filename(fmt)
+        return StreamingResponse(iter_export(df, fmt), media_type=EXPORT_FORMATS[fmt][2], headers={
+            "ETag": etag, "Cache-Control": "no-cache", "X-Total-Rows": str(len(df)),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        })
+
+    return (fmt,), build
+
+
+def _summary_endpoint(request, filters):
+    params = request.query_params
+    group_by = params.get("group_by") or None
+    if group_by is not None and group_by not in CATEGORICAL_FIELDS:
+        raise APIError(f"group_by must be one of: {', '.join(CATEGORICAL_FIELDS)}")
+
+    def build(etag):
+        from cache import object_memo
+        from data import summarize_portfolio
+
+        df = _selection(filters)
+        payload = {'summary': object_memo(df, 'summary', lambda: summarize_portfolio(df))}
+        if group_by:
+            payload['groups'] = object_memo(df, f"group_summary:{group_by}", lambda: group_summary(df, group_by))
+        return _json_response(payload, etag)
+
+    return (group_by,), build
+
+
+def group_summary(df, group_by):
+    """Return count, and sum and mean of every numeric field, for each value of a categorical field."""
+    fields = [f for f in NUMERIC_FIELDS if f in df.columns]
+    grouped = df.groupby(group_by, observed=True, sort=True)[fields]
+    sums, means, counts = grouped.sum(), grouped.mean(), grouped.size()
+    return [
+        {
+            group_by: str(group),
+            'count': int(counts[group]),
+            'sum': {f: _clean([sums.at[group, f]])[0] for f in fields},
+            'mean': {f: _clean([means.at[group, f]])[0] for f in fields},
+        }
+        for group in counts.index
+    ]
+
+
+def _series_endpoint(request, filters):
+    params = request.query_params
+    x = params.get("x", "department")
+    y = params.get("y") or None
+    color = params.get("color", "None")
+    if x not in CATEGORICAL_FIELDS + NUMERIC_FIELDS:
+        raise APIError(f"Unknown x field: {x}")
+    if y is not None and y not in NUMERIC_FIELDS:
+        raise APIError(f"y must be a numeric field: {', '.join(NUMERIC_FIELDS)}")
+    if color not in COLOR_OPTIONS:
+        raise APIError(f"color must be one of: {', '.join(COLOR_OPTIONS)}")
+    kind = _choice_param(params, "kind", SERIES_KINDS, "auto")
+    if kind == "auto":
+        kind = "bar" if x in CATEGORICAL_FIELDS else ("scatter" if y else "histogram")
+    # Only a bar series can count rows without a y field
+    if y is None and (kind == "scatter" or (kind == "bar" and params.get("agg") != "count")):
+        raise APIError(f"A {kind} series needs a y field")
+    if kind in ("histogram", "scatter") and x not in NUMERIC_FIELDS:
+        raise APIError(f"A {kind} series needs a numeric x field")
+    agg = _choice_param(params, "agg", AGGREGATIONS, "sum")
+    top_n = _int_param(params, "top_n", 0)
+    bins = _int_param(params, "bins", 15, minimum=1)
+    limit = _int_param(params, "limit", API_SERIES_POINTS, minimum=1)
+
+    def build(etag):
+        df = _selection(filters)
+        return _json_response(chart_series(df, kind, x, y, None if color == "None" else color, agg, top_n, bins, limit), etag)
+
+    return (kind, x, y, color, agg, top_n, bins, limit), build
+
+
+def chart_series(df, kind, x, y, color, agg="sum", top_n=0, bins=15, limit=API_SERIES_POINTS):
+    """Compute chart-ready series of a selection, one per color group.
+
+    bar: y aggregated (sum, mean, or count) per x value, optionally the top_n
+    x values by total plus "Other"; histogram: counts of x per bin; scatter:
+    x and y points, evenly thinned to at most `limit` in total.
+    """
+    import numpy as np
+    import pandas as pd
+    from aggregations import nice_bin_edges, grouped_histogram
+    from ranking import top_n_groups
+
+    if color:
+        color_codes, groups = pd.factorize(df[color], sort=True)
+        groups = [str(g) for g in groups]
+    else:
+        color_codes, groups = np.zeros(len(df), dtype=np.int64), ["All"]
+    payload = {'kind': kind, 'x_field': x, 'y_field': y, 'color_field': color, 'rows': len(df)}
+
+    if kind == "bar":
+        x_codes, x_values = pd.factorize(df[x], sort=True)
+        values = df[y].to_numpy(dtype=float) if y else np.ones(len(df))
+        if top_n:
+            totals_by = values if agg != "count" else np.ones(len(df))
+            top, slots, folded = top_n_groups(x_codes, totals_by, len(x_values), top_n)
+        else:
+            top, slots, folded = np.arange(len(x_values)), np.arange(len(x_values)), 0
+        names = [str(x_values[i]) for i in top] + (["Other"] if folded else [])
+        valid = (x_codes >= 0) & (color_codes >= 0) & ~np.isnan(values)
+        cells = slots[x_codes[valid]] * len(groups) + color_codes[valid]
+        size = len(names) * len(groups)
+        counts = np.bincount(cells, minlength=size)[:size].reshape(len(names), len(groups))
+        sums = np.bincount(cells, weights=values[valid], minlength=size)[:size].reshape(len(names), len(groups))
+        if agg == "count":
+            result = counts.astype(float)
+        elif agg == "mean":
+            result = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+        else:
+            result = sums
+        payload.update(agg=agg, x=names, series=[
+            {'name': group, 'y': _clean(result[:, g])} for g, group in enumerate(groups)
+        ])
+        return payload
+
+    x_values = df[x].to_numpy(dtype=float)
+    if kind == "histogram":
+        valid = ~np.isnan(x_values) & (color_codes >= 0)
+        edges = nice_bin_edges(x_values[valid], bins)
+        counts = grouped_histogram(x_values[valid], color_codes[valid], len(groups), edges)
+        payload.update(edges=_clean(edges), series=[
+            {'name': group, 'counts': counts[g].tolist()} for g, group in enumerate(groups)
+        ])
+        return payload
+
+    y_values = df[y].to_numpy(dtype=float)
+    rows = np.flatnonzero(~np.isnan(x_values) & ~np.isnan(y_values) & (color_codes >= 0))
+    payload['points'] = len(rows)
+    if len(rows) > limit:
+        rows = rows[np.linspace(0, len(rows) - 1, limit).astype(np.int64)]
+    payload['sampled'] = payload['points'] > len(rows)
+    payload['series'] = [
+        {'name': group, 'x': _clean(x_values[members]), 'y': _clean(y_values[members])}
+        for g, group in enumerate(groups)
+        for members in [rows[color_codes[rows] == g]]
+    ]
+    return payload
+
+
+def _is_admin(request):
+    """Allow admin requests bearing ADMIN_TOKEN."""
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    # Compared as bytes: compare_digest raises TypeError on non-ASCII str
+    return hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode())
+
+
+async def _profiling_endpoint(request):
+    """GET returns the profiling status; POST with enabled=1|0 (and optionally session=<id>) toggles it."""
+    from profiling import set_profiling, profiling_status
+
+    if not ADMIN_TOKEN:
+        # Behind a reverse proxy every client looks local, so there is no tokenless fallback
+        return Response(json.dumps({'error': "Admin endpoints are disabled; set AEGIS_ADMIN_TOKEN"}), status_code=404, media_type=JSON_MEDIA_TYPE)
+    if not _is_admin(request):
+        return Response(json.dumps({'error': "Admin access required"}), status_code=403, media_type=JSON_MEDIA_TYPE)
+    if request.method == "POST":
+        enabled = request.query_params.get("enabled", "1").lower() in ("1", "true", "on", "yes")
+        return Response(json.dumps(set_profiling(enabled, request.query_params.get("session"))), media_type=JSON_MEDIA_TYPE)
+    return Response(json.dumps(profiling_status()), media_type=JSON_MEDIA_TYPE)
+
+
+def create_api(prefix=API_PREFIX):
+    """Build the API as a Starlette app serving its routes under prefix."""
+    return Starlette(routes=[
+        Mount(prefix, routes=[
+            Route("/version", _handler(_version_endpoint)),
+            Route("/rows", _handler(_rows_endpoint)),
+            Route("/summary", _handler(_summary_endpoint)),
+            Route("/series", _handler(_series_endpoint)),
+            Route("/export", _handler(_export_endpoint)),
+            Route("/admin/profiling", _profiling_endpoint, methods=["GET", "POST"]),
+        ])
+    ])
+
+
+def mount_api(shiny_app, prefix=API_PREFIX):
+    """Serve the API under prefix; everything else, including lifespan, goes to the Shiny app."""
+    api = create_api(prefix)
+
+    async def app(scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] == "http" and (path == prefix or path.startswith(prefix + "/")):
+            await api(scope, receive, send)
+        else:
+            await shiny_app(scope, receive, send)
+
+    return app
@@ -4,7 +4,16 @@ Main application entry point
 """
 
 from shiny import App
-from ui import app_ui
 from server import server
+from api import mount_api
+from metrics import start_metrics_server
 
-app = App(app_ui, server)
+
+def app_ui(request):
+    """Serve the page layout; ui.py, and with it the widget toolkit, is imported with the first request."""
+    from ui import app_ui as layout
+    return layout
+
+
+app = mount_api(App(app_ui, server))
+start_metrics_server()
@@ -0,0 +1,259 @@
+"""
+AEGIS Batch Renderer
+Render many chart configs headlessly across a process pool into one HTML report
+
+Usage:
+    python batch_render.py charts.json                     # writes aegis_report.html
+    python batch_render.py charts.json --output pack.html --workers 4 --json timings.json
+
+The spec is a JSON list of chart configs (the custom chart schema, plus
+optional "filters" and "title"), or an object with "charts", default
+"filters", a report "title", and a "grid" whose keys (chart or filter fields)
+list values to expand every chart over:
+
+    {
+      "title": "Weekly Portfolio Pack",
+      "filters": {"max_budget": 400},
+      "grid": {"departments": ["Army", "Navy", "Air Force", "Marines"],
+               "chart_type": ["Bar Chart", "Box Plot"], "y_axis": ["cost_m", "net_value"]},
+      "charts": [{"x_axis": "category", "color_by": "priority"}]
+    }
+"""
+
+import argparse
+import html
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import COLORS, FIELD_DISPLAY_NAMES, BATCH_WORKERS
+from utils import chart_error, create_chart, filter_base_data, validate_chart_config
+
+
+# Sidebar defaults from ui.py, used for any filter a chart does not set
+DEFAULT_FILTERS = {
+    'departments': ["Army", "Navy", "Air Force", "Marines"],
+    'categories': ["Vehicles", "Aircraft", "Communications", "Weapons"],
+    'priorities': ["Critical", "High", "Medium"],
+    'max_budget': 300,
+    'min_roi': 1.2,
+}
+
+DEFAULT_CHART = {
+    'chart_type': 'Bar Chart',
+    'x_axis': 'department',
+    'y_axis': 'cost_m',
+    'color_by': 'None',
+    'show_trendline': False,
+    'show_frontier': False,
+    'top_n': 0,
+}
+
+# Filters that take a list of values; a single value in a spec or grid is wrapped
+LIST_FILTERS = ('departments', 'categories', 'priorities')
+
+
+def load_jobs(spec):
+    """Expand a batch spec into a report title and a list of render jobs."""
+    if isinstance(spec, list):
+        spec = {'charts': spec}
+    charts = spec.get('charts') or [{}]
+    grid = spec.get('grid') or {}
+    combinations = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+    jobs = []
+    seen = set()
+    for chart, combination in itertools.product(charts, combinations):
+        # A chart's own settings win over the grid, so the grid only fills in what it leaves open
+        merged = {**combination, **chart}
+        filters = {
+            **DEFAULT_FILTERS, **spec.get('filters', {}),
+            **{key: value for key, value in merged.items() if key in DEFAULT_FILTERS},
+            **chart.get('filters', {}),
+        }
+        for key in LIST_FILTERS:
+            if isinstance(filters[key], str):
+                filters[key] = [filters[key]]
+        config = {
+            **DEFAULT_CHART,
+            **{key: value for key, value in merged.items() if key not in DEFAULT_FILTERS and key not in ('filters', 'title')},
+        }
+        identity = json.dumps([config, filters], sort_keys=True, default=str)
+        if identity in seen:
+            continue
+        seen.add(identity)
+        jobs.append({
+            'index': len(jobs),
+            'title': merged.get('title') or default_title(config, filters),
+            'config': config,
+            'filters': filters,
+        })
+    return spec.get('title', "AEGIS Chart Report"), jobs
+
+
+def default_title(config, filters):
+    """Title a chart by its type, fields, and department filter."""
+    x = FIELD_DISPLAY_NAMES.get(config['x_axis'], config['x_axis'])
+    y = FIELD_DISPLAY_NAMES.get(config['y_axis'], config['y_axis'])
+    departments = ", ".join(filters['departments']) if len(filters['departments']) < 4 else "All departments"
+    return f"{config['chart_type']}: {y} by {x} ({departments})"
+
+
+def render_job(job):
+    """Filter the data and render one chart to an HTML fragment, timing each step."""
+    result = {'index': job['index'], 'rows': 0, 'filter_ms': 0.0, 'chart_ms': 0.0, 'html_ms': 0.0, 'html': None}
+    errors = validate_chart_config(job['config'])
+    unknown = set(job['filters']) - set(DEFAULT_FILTERS)
+    if unknown:
+        errors.append(f"Unknown filters: {', '.join(sorted(unknown))}")
+    if errors:
+        return {**result, 'error': "; ".join(errors)}
+
+    try:
+        start = time.perf_counter()
+        df = filter_base_data(**job['filters'])
+        filtered = time.perf_counter()
+        config = job['config']
+        fig = create_chart(
+            df, config['chart_type'], config['x_axis'], config['y_axis'], config['color_by'],
+            config['show_trendline'], config['show_frontier'], config['top_n']
+        )
+        drawn = time.perf_counter()
+        # create_chart reports bad input as an error figure instead of raising
+        message = chart_error(fig)
+        if message:
+            return {**result, 'rows': len(df), 'error': message.replace("<br>", " ")}
+        fragment = fig.to_html(full_html=False, include_plotlyjs=False, div_id=f"chart-{job['index']}-plot")
+        done = time.perf_counter()
+    except Exception as e:
+        return {**result, 'error': str(e)}
+
+    return {
+        **result,
+        'rows': len(df),
+        'filter_ms': (filtered - start) * 1000,
+        'chart_ms': (drawn - filtered) * 1000,
+        'html_ms': (done - drawn) * 1000,
+        'html': fragment,
+        'error': None,
+    }
+
+
+def _warm_worker():
+    """Load the dataset and pay one-time plotting import costs before any chart is timed."""
+    from data import get_base_data
+    create_chart(get_base_data().head(), 'Bar Chart', 'department', 'cost_m', 'None').to_html(include_plotlyjs=False)
+
+
+def render_all(jobs, workers):
+    """Render every job, over a spawned process pool when workers > 1; results keep job order."""
+    if workers <= 1 or len(jobs) <= 1:
+        _warm_worker()
+        return [render_job(job) for job in jobs]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_warm_worker) as pool:
+        return list(pool.map(render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def build_report(title, jobs, results, workers, wall_ms):
+    """Assemble a self-contained HTML report with plotly.js embedded once."""
+    from plotly.offline import get_plotlyjs
+
+    rendered = [r for r in results if r['error'] is None]
+    summary_rows = []
+    sections = []
+    for job, result in zip(jobs, results):
+        anchor = f"chart-{job['index']}"
+        total_ms = result['filter_ms'] + result['chart_ms'] + result['html_ms']
+        status = "OK" if result['error'] is None else f"Error: {result['error']}"
+        summary_rows.append(
+            f"<tr><td>{job['index'] + 1}</td><td><a href=\"#{anchor}\">{html.escape(job['title'])}</a></td>"
+            f"<td>{result['rows']:,}</td><td>{result['filter_ms']:.1f}</td><td>{result['chart_ms']:.1f}</td>"
+            f"<td>{result['html_ms']:.1f}</td><td>{total_ms:.1f}</td><td>{html.escape(status)}</td></tr>"
+        )
+        body = result['html'] if result['error'] is None else f"<p class=\"error\">{html.escape(status)}</p>"
+        sections.append(
+            f"<section id=\"{anchor}\"><h2>{job['index'] + 1}. {html.escape(job['title'])}</h2>"
+            f"<p class=\"meta\">{html.escape(json.dumps(job['config']))}<br>{html.escape(json.dumps(job['filters']))}</p>"
+            f"{body}</section>"
+        )
+
+    chart_ms = sum(r['chart_ms'] for r in rendered)
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<script type="text/javascript">{get_plotlyjs()}</script>
+<style>
+body {{ background: {COLORS['background']}; color: {COLORS['text']}; font-family: Inter, -apple-system, 'Segoe UI', sans-serif; margin: 2rem; }}
+a {{ color: {COLORS['accent_blue']}; }}
+table {{ border-collapse: collapse; margin-bottom: 2rem; font-size: 0.85rem; }}
+th, td {{ border-bottom: 1px solid {COLORS['border']}; padding: 0.3rem 0.8rem; text-align: left; }}
+th {{ color: {COLORS['text_secondary']}; }}
+section {{ background: {COLORS['panel']}; border: 1px solid {COLORS['border']}; border-radius: 8px; padding: 1rem; margin-bottom: 1.5rem; }}
+.meta {{ color: {COLORS['text_secondary']}; font-size: 0.75rem; font-family: monospace; }}
+.error {{ color: {COLORS['accent_red']}; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p>{len(rendered)} of {len(jobs)} charts rendered on {workers} worker{'s' if workers != 1 else ''} in {wall_ms / 1000:.1f} s
+(chart time {chart_ms / 1000:.1f} s) &middot; generated {time.strftime("%Y-%m-%d %H:%M")}</p>
+<table>
+<tr><th>#</th><th>Chart</th><th>Rows</th><th>Filter ms</th><th>Chart ms</th><th>HTML ms</th><th>Total ms</th><th>Status</th></tr>
+{''.join(summary_rows)}
+</table>
+{''.join(sections)}
+</body>
+</html>
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render AEGIS chart configs in parallel into a single HTML report.")
+    parser.add_argument("spec", help="JSON file with chart configs, filters, and an optional grid")
+    parser.add_argument("--output", default="aegis_report.html", help="HTML report path")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="worker processes (0 = one per CPU)")
+    parser.add_argument("--json", help="write per-chart timings to this path")
+    args = parser.parse_args(argv)
+
+    with open(args.spec) as f:
+        title, jobs = load_jobs(json.load(f))
+    workers = min(args.workers or os.cpu_count() or 1, max(len(jobs), 1))
+
+    start = time.perf_counter()
+    results = render_all(jobs, workers)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(build_report(title, jobs, results, workers, wall_ms))
+
+    failed = [r for r in results if r['error'] is not None]
+    print(f"Rendered {len(jobs) - len(failed)} of {len(jobs)} charts on {workers} worker(s) in {wall_ms / 1000:.1f} s")
+    for result in failed:
+        print(f"  chart {result['index'] + 1}: {result['error']}")
+    print(f"Report written to {args.output}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                'workers': workers,
+                'wall_ms': round(wall_ms, 3),
+                'charts': [
+                    {'title': job['title'], 'config': job['config'], 'filters': job['filters'],
+                     **{key: value for key, value in result.items() if key != 'html'}}
+                    for job, result in zip(jobs, results)
+                ],
+            }, f, indent=2)
+        print(f"Timings written to {args.json}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+AEGIS Benchmarks
+Wall time, peak memory, and payload size of the dashboard hot paths
+
+Usage:
+    python benchmark.py                              # 20 / 10k / 1M rows
+    python benchmark.py --sizes 20 10000 --output bench.json
+    python benchmark.py --compare bench.json         # diff against a saved run
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from data import calculate_metrics, generate_equipment_data, generate_synthetic_portfolio
+from optimizer import optimize_portfolio
+from simulation import simulate_portfolio
+from sensitivity import run_sensitivity
+from cashflow import project_cash_flows
+from ranking import rank_rows
+from export import iter_export
+from utils import filter_data, create_chart, query_table, TABLE_CACHE
+
+
+DEFAULT_SIZES = [20, 10_000, 1_000_000]
+
+# Sidebar defaults from ui.py, i.e. what every new session evaluates first
+FILTER_ARGS = (
+    ["Army", "Navy", "Air Force", "Marines"],
+    ["Vehicles", "Aircraft", "Communications", "Weapons"],
+    ["Critical", "High", "Medium"],
+    300,
+    1.2,
+)
+
+# Total budget ($M) for the optimizer case
+OPTIMIZER_BUDGET = 600
+
+# Scenarios per item for the risk simulation case
+SIMULATION_SCENARIOS = 200
+
+CHART_CASES = [
+    ("Bar Chart", "department", "cost_m", "category", False, False),
+    ("Scatter Plot", "cost_m", "roi", "department", False, False),
+    ("Scatter Plot", "cost_m", "roi", "department", True, False),
+    ("Scatter Plot", "total_ownership_cost", "net_value", "department", False, "skyline"),
+    ("Box Plot", "department", "roi", "priority", False, False),
+    ("Histogram", "roi", "cost_m", "category", False, False),
+    ("Tornado", "None", "net_value", "None", False, False),
+    ("Cash Flow", "None", "npv", "None", False, False),
+]
+
+
+def build_portfolio(rows, seed=42):
+    """Build a raw portfolio of the requested size (20 means the built-in dataset)."""
+    if rows == 20:
+        return generate_equipment_data()
+    return generate_synthetic_portfolio(rows, seed=seed)
+
+
+def measure(fn, repeat):
+    """Time fn over several runs, then trace one extra run for peak memory."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, {
+        'wall_ms_median': round(statistics.median(timings), 3),
+        'wall_ms_min': round(min(timings), 3),
+        'peak_mem_mb': round(peak / 1e6, 3),
+    }
+
+
+def run_benchmarks(sizes, repeat=3):
+    """Run every benchmark case for each portfolio size and return result records."""
+    results = []
+
+    def record(case, rows, stats, **extra):
+        entry = {'case': case, 'rows': rows, **stats, **extra}
+        results.append(entry)
+        print(f"  {case:<45} {stats['wall_ms_median']:>10.2f} ms  {stats['peak_mem_mb']:>9.2f} MB"
+              + (f"  {extra['json_bytes']:>11,} B" if 'json_bytes' in extra else ""))
+
+    # Pay one-time import and template costs before anything is timed
+    warmup = calculate_metrics(build_portfolio(20))
+    for chart_type, x, y, color, trendline, frontier in CHART_CASES:
+        create_chart(warmup, chart_type, x, y, color, trendline, frontier).to_json()
+
+    for rows in sizes:
+        print(f"\n{rows:,} rows")
+        raw = build_portfolio(rows)
+
+        metrics_df, stats = measure(lambda: calculate_metrics(raw), repeat)
+        record("calculate_metrics", rows, stats)
+
+        filtered, stats = measure(lambda: filter_data(metrics_df, *FILTER_ARGS), repeat)
+        record("filter_data", rows, stats, selected_rows=len(filtered))
+
+        def first_page():
+            TABLE_CACHE.clear()
+            return query_table(filtered)
+
+        _, stats = measure(first_page, repeat)
+        record("query_table[sort + first page]", rows, stats)
+
+        _, stats = measure(lambda: query_table(filtered, page=1), repeat)
+        record("query_table[next page]", rows, stats)
+
+        _, stats = measure(lambda: rank_rows(filtered, 'net_value', 100), repeat)
+        record("rank_rows[top 100]", rows, stats)
+
+        result, stats = measure(lambda: optimize_portfolio(filtered, OPTIMIZER_BUDGET), repeat)
+        record(f"optimize_portfolio[{result['method']}]", rows, stats, selected_rows=len(result['rows']))
+
+        _, stats = measure(lambda: simulate_portfolio(filtered, SIMULATION_SCENARIOS), repeat)
+        record(f"simulate_portfolio[{SIMULATION_SCENARIOS} scenarios]", rows, stats)
+
+        _, stats = measure(lambda: run_sensitivity(filtered), repeat)
+        record("run_sensitivity", rows, stats)
+
+        _, stats = measure(lambda: project_cash_flows(filtered), repeat)
+        record("project_cash_flows", rows, stats)
+
+        for fmt in ("parquet", "csv"):
+            _, stats = measure(lambda: sum(len(chunk) for chunk in iter_export(filtered, fmt)), repeat)
+            record(f"iter_export[{fmt}]", rows, stats)
+
+        for chart_type, x, y, color, trendline, frontier in CHART_CASES:
+            name = f"create_chart[{chart_type}{' + trendline' if trendline else ''}{' + frontier' if frontier else ''}]"
+            fig, stats = measure(lambda: create_chart(filtered, chart_type, x, y, color, trendline, frontier), repeat)
+            payload, json_stats = measure(fig.to_json, 1)
+            stats['json_ms'] = json_stats['wall_ms_median']
+            record(name, rows, stats, json_bytes=len(payload))
+
+    return results
+
+
+def git_commit():
+    """Return the current git commit, if the benchmark runs inside a checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print the change of each case against a previously saved run."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['case'], r['rows']): r for r in baseline['results']}
+
+    print(f"\nComparison with {baseline_path} ({baseline['meta'].get('commit') or 'unknown commit'})")
+    for r in results:
+        old = previous.get((r['case'], r['rows']))
+        if old is None:
+            continue
+        ratio = r['wall_ms_median'] / old['wall_ms_median'] if old['wall_ms_median'] else float('inf')
+        print(f"  {r['case']:<45} {r['rows']:>10,} rows  {old['wall_ms_median']:>10.2f} -> "
+              f"{r['wall_ms_median']:>10.2f} ms  ({ratio:.2f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AEGIS filtering, metrics, table, and chart paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="portfolio sizes to run")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--output", help="write machine-readable JSON results to this path")
+    parser.add_argument("--compare", help="compare against a JSON file from a previous run")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat)
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
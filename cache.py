@@ -0,0 +1,164 @@
+"""
+AEGIS Caching
+Process-wide, thread-safe LRU caches shared across Shiny sessions
+"""
+
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+# Every cache registers itself so reloads can clear them and monitoring can read them
+_CACHES = []
+
+# id(obj) -> (weakref to obj, {name: value}); entries are dropped when the object is collected
+_OBJECT_MEMOS = {}
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and approximate size in bytes."""
+
+    def __init__(self, name, max_entries=128, max_bytes=None, sizeof=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or estimate_nbytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _CACHES.append(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, marking it most recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=None):
+        """Store a value, evicting least recently used entries to stay within bounds."""
+        nbytes = self.sizeof(value) if nbytes is None else nbytes
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return value
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self.bytes > self.max_bytes)
+            ):
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.bytes -= evicted_bytes
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            # Computed outside the lock so a slow miss never blocks other sessions
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        """Drop every entry; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Return counters and occupancy for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Values sampled per object column when estimating the size of its Python objects
+NBYTES_SAMPLE = 1000
+
+
+def _holds_python_objects(dtype):
+    """Return True for columns of pointers to Python objects (object dtype or python-backed strings)."""
+    return dtype == object or (isinstance(dtype, pd.StringDtype) and dtype.storage == "python")
+
+
+def estimate_nbytes(value):
+    """Estimate the memory held by a cached value.
+
+    memory_usage(deep=False) counts only the pointers of object columns, so the
+    objects they point to are added from an evenly spaced sample of at most
+    NBYTES_SAMPLE values per column, which stays cheap at millions of rows.
+    """
+    if isinstance(value, pd.Series):
+        value = value.to_frame()
+    if isinstance(value, pd.DataFrame):
+        total = int(np.sum(value.memory_usage(index=True, deep=False)))
+        n = len(value)
+        if n:
+            positions = np.unique(np.linspace(0, n - 1, min(n, NBYTES_SAMPLE)).astype(np.int64))
+            for i, dtype in enumerate(value.dtypes):
+                if _holds_python_objects(dtype):
+                    sample = value.iloc[positions, i]
+                    total += int(sum(sys.getsizeof(v) for v in sample) * n / len(positions))
+        return total
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    return int(getattr(value, 'nbytes', 0)) or 64
+
+
+def clear_caches():
+    """Clear every registered cache, e.g. after the dataset is reloaded."""
+    for cache in _CACHES:
+        cache.clear()
+
+
+def cache_stats():
+    """Return stats for every registered cache."""
+    return [cache.stats() for cache in _CACHES]
+
+
+def object_memo(obj, name, compute):
+    """Return a value memoized on an object's identity, computing it on first use.
+
+    Used for things derived from immutable frames (indexes, fingerprints) that
+    must not outlive the frame and cannot be stored on it.
+    """
+    key = id(obj)
+    entry = _OBJECT_MEMOS.get(key)
+    if entry is None or entry[0]() is not obj:
+        entry = _OBJECT_MEMOS[key] = (weakref.ref(obj), {})
+        weakref.finalize(obj, _OBJECT_MEMOS.pop, key, None)
+    memo = entry[1]
+    if name not in memo:
+        memo[name] = compute()
+    return memo[name]
+
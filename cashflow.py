@@ -0,0 +1,111 @@
+"""
+AEGIS Cash Flow Projection
+Year-by-year outlays and returns of each upgrade, discounted to NPV
+"""
+
+import numpy as np
+from config import PROJECTION_DISCOUNT_RATE, PROJECTION_BLOCK_ELEMENTS
+
+
+# Y-axis fields of the Cash Flow chart: nominal (net_value) or discounted (npv) flows
+CASH_FLOW_FIELDS = ["net_value", "npv"]
+
+
+def cash_flow_matrices(cost, roi, maintenance, age, lifespan, horizon):
+    """Return (maintenance, returns) as (items, horizon) matrices for years 1..horizon.
+
+    An item is projected over its remaining life, lifespan - age years: year t
+    is in service while t <= lifespan - age, and later years are masked to
+    zero, so items with different remaining lives share one matrix. Each
+    service year earns cost x roi / lifespan, the yearly rate of the lump-sum
+    lifetime return. Maintenance averages cost x maintenance per year over a
+    whole life, like calculate_metrics, but follows platform wear: year t is
+    weighted by the platform's age in that year (age + t), so an old platform
+    pays more upkeep in its last years than a new one does in its first.
+    """
+    years = np.arange(1, horizon + 1, dtype=float)
+    remaining = np.maximum(lifespan - age, 0.0)
+    in_service = years[None, :] <= remaining[:, None]
+
+    # Mean wear over a whole life of 1..lifespan years is (lifespan + 1) / 2
+    yearly_upkeep = np.divide(2.0 * cost * maintenance, lifespan + 1.0,
+                              out=np.zeros_like(cost), where=lifespan + 1.0 > 0)
+    wear = (age[:, None] + years) * in_service
+    wear *= yearly_upkeep[:, None]
+
+    yearly_return = np.divide(cost * roi, lifespan, out=np.zeros_like(cost), where=lifespan > 0)
+    returns = in_service * yearly_return[:, None]
+    return wear, returns
+
+
+def project_cash_flows(df, rate=PROJECTION_DISCOUNT_RATE):
+    """Project the cash flows of every upgrade and of the whole portfolio.
+
+    Each upgrade pays its cost in year 0, then maintenance and returns over the
+    remaining life of its platform (see cash_flow_matrices). Items are projected in blocks of about
+    PROJECTION_BLOCK_ELEMENTS item-years.
+
+    Returns a dict with 'rate', 'npv' and 'payback_years' arrays aligned with
+    df (NaN for rows with missing inputs; payback is the first year the
+    discounted cumulative cash flow turns non-negative, NaN if it never does),
+    and 'portfolio': the yearly 'years', 'capital', 'maintenance', 'returns',
+    'net', 'discounted_net', and 'cumulative_npv' arrays from year 0, and the
+    total 'npv'.
+    """
+    inputs = df[['cost_m', 'roi', 'maintenance_pct', 'age_years', 'lifespan_years']].to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(inputs).any(axis=1))
+    cost, roi, maintenance, age, lifespan = inputs[valid].T
+    lifespan = np.maximum(lifespan, 0.0)
+    age = np.maximum(age, 0.0)
+
+    horizon = max(int(np.ceil((lifespan - age).max())), 1) if len(valid) else 1
+    discount = (1.0 + rate) ** -np.arange(1, horizon + 1, dtype=float)
+
+    npv = np.full(len(df), np.nan)
+    payback = np.full(len(df), np.nan)
+    maintenance_by_year = np.zeros(horizon)
+    returns_by_year = np.zeros(horizon)
+
+    block = max(1, PROJECTION_BLOCK_ELEMENTS // horizon)
+    for start in range(0, len(valid), block):
+        rows = slice(start, start + block)
+        upkeep, returns = cash_flow_matrices(cost[rows], roi[rows], maintenance[rows], age[rows], lifespan[rows], horizon)
+        maintenance_by_year += upkeep.sum(axis=0)
+        returns_by_year += returns.sum(axis=0)
+
+        # Running discounted position after each year, starting from the year 0 outlay
+        position = returns
+        position -= upkeep
+        position *= discount
+        np.cumsum(position, axis=1, out=position)
+        position -= cost[rows, None]
+
+        npv[valid[rows]] = position[:, -1]
+        recovered = position >= 0
+        first = np.argmax(recovered, axis=1) + 1.0
+        first[~recovered.any(axis=1)] = np.nan
+        first[cost[rows] <= 0] = 0.0
+        payback[valid[rows]] = first
+
+    capital = np.zeros(horizon + 1)
+    capital[0] = cost.sum()
+    maintenance_by_year = np.concatenate(([0.0], maintenance_by_year))
+    returns_by_year = np.concatenate(([0.0], returns_by_year))
+    net = returns_by_year - maintenance_by_year - capital
+    discounted_net = net * np.concatenate(([1.0], discount))
+
+    return {
+        'rate': rate,
+        'npv': npv,
+        'payback_years': payback,
+        'portfolio': {
+            'years': np.arange(horizon + 1),
+            'capital': capital,
+            'maintenance': maintenance_by_year,
+            'returns': returns_by_year,
+            'net': net,
+            'discounted_net': discounted_net,
+            'cumulative_npv': np.cumsum(discounted_net),
+            'npv': float(discounted_net.sum()),
+        },
+    }
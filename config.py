@@ -3,6 +3,8 @@ AEGIS Configuration
 Constants, field definitions, and display names
 """
 
+import os
+
 # Color palette
 COLORS = {
     'background': '#0a0e1a',
@@ -42,10 +44,25 @@ PRIORITY_COLORS = {
 NUMERIC_FIELDS = [
     "cost_m", "roi", "maintenance_pct", "age_years",
     "lifespan_years", "total_ownership_cost",
-    "lifetime_return", "net_value", "value_score"
+    "lifetime_return", "net_value", "value_score",
+    "npv", "payback_years"
 ]
 
 CATEGORICAL_FIELDS = ["upgrade_name", "department", "category", "priority"]
+
+# Column schema every data source is coerced to before calculate_metrics
+BASE_SCHEMA = {
+    "upgrade_id": "str",
+    "upgrade_name": "str",
+    "department": "category",
+    "category": "category",
+    "priority": "category",
+    "cost_m": "float64",
+    "roi": "float64",
+    "maintenance_pct": "float64",
+    "age_years": "int64",
+    "lifespan_years": "int64",
+}
 COLOR_OPTIONS = ["None", "department", "category", "priority"]
 
 # Display names
@@ -62,7 +79,9 @@ FIELD_DISPLAY_NAMES = {
     "total_ownership_cost": "Total Ownership Cost ($M)",
     "lifetime_return": "Lifetime Return ($M)",
     "net_value": "Net Value ($M)",
-    "value_score": "Value Score"
+    "value_score": "Value Score",
+    "npv": "Net Present Value ($M)",
+    "payback_years": "Discounted Payback (Years)"
 }
 
 COLOR_DISPLAY_NAMES = {
@@ -72,3 +91,163 @@ COLOR_DISPLAY_NAMES = {
     "priority": "By Priority"
 }
 
+
+# Data source
+# AEGIS_DATA_SOURCE selects the loader (synthetic, csv, parquet, arrow). When it
+# is unset the format is inferred from AEGIS_DATA_PATH, and the built-in
+# synthetic dataset is used if no path is given either.
+DATA_SOURCE = os.environ.get("AEGIS_DATA_SOURCE", "")
+DATA_PATH = os.environ.get("AEGIS_DATA_PATH", "")
+DATA_CHUNK_ROWS = int(os.environ.get("AEGIS_DATA_CHUNK_ROWS", "250000"))
+DATA_MEMORY_MAP = os.environ.get("AEGIS_DATA_MEMORY_MAP", "1") != "0"
+
+# Synthetic data: 0 rows means the original 20-item dataset
+SYNTHETIC_ROWS = int(os.environ.get("AEGIS_SYNTHETIC_ROWS", "0"))
+SYNTHETIC_SEED = int(os.environ.get("AEGIS_SYNTHETIC_SEED", "42"))
+
+# Cross-session cache of filtered results
+FILTER_CACHE_ENTRIES = int(os.environ.get("AEGIS_FILTER_CACHE_ENTRIES", "64"))
+FILTER_CACHE_MB = float(os.environ.get("AEGIS_FILTER_CACHE_MB", "512"))
+
+# Scatter plot level of detail: WebGL above the first row count, a
+# server-side density grid above the second
+SCATTER_WEBGL_ROWS = int(os.environ.get("AEGIS_SCATTER_WEBGL_ROWS", "1000"))
+SCATTER_DENSITY_ROWS = int(os.environ.get("AEGIS_SCATTER_DENSITY_ROWS", "50000"))
+SCATTER_DENSITY_BINS = int(os.environ.get("AEGIS_SCATTER_DENSITY_BINS", "120"))
+SCATTER_DENSITY_TOP_ITEMS = 3
+
+# Most extreme outliers drawn per box; box statistics always use every point
+BOX_MAX_OUTLIERS = int(os.environ.get("AEGIS_BOX_MAX_OUTLIERS", "200"))
+
+# Fitted trendlines cached per selection and chart fields
+TRENDLINE_CACHE_ENTRIES = int(os.environ.get("AEGIS_TRENDLINE_CACHE_ENTRIES", "256"))
+
+# Pareto frontiers cached per selection and objective fields
+FRONTIER_CACHE_ENTRIES = int(os.environ.get("AEGIS_FRONTIER_CACHE_ENTRIES", "256"))
+
+# Cross-session cache of serialized chart figures
+FIGURE_CACHE_ENTRIES = int(os.environ.get("AEGIS_FIGURE_CACHE_ENTRIES", "256"))
+FIGURE_CACHE_MB = float(os.environ.get("AEGIS_FIGURE_CACHE_MB", "256"))
+
+# Import time budget for the app entry point, checked by profile_startup.py
+STARTUP_BUDGET_MS = float(os.environ.get("AEGIS_STARTUP_BUDGET_MS", "1500"))
+
+# Budget optimizer: total budget shown by default ($M), the cost grid used by the
+# exact DP solver, and the problem sizes above which it falls back to branch and
+# bound and then to the greedy heuristic
+OPTIMIZER_DEFAULT_BUDGET = float(os.environ.get("AEGIS_OPTIMIZER_DEFAULT_BUDGET", "600"))
+OPTIMIZER_COST_RESOLUTION = float(os.environ.get("AEGIS_OPTIMIZER_COST_RESOLUTION", "0.1"))
+OPTIMIZER_DP_CELLS = int(os.environ.get("AEGIS_OPTIMIZER_DP_CELLS", "20000000"))
+OPTIMIZER_EXACT_ITEMS = int(os.environ.get("AEGIS_OPTIMIZER_EXACT_ITEMS", "200"))
+OPTIMIZER_MAX_NODES = int(os.environ.get("AEGIS_OPTIMIZER_MAX_NODES", "200000"))
+
+# Monte Carlo risk simulation: scenarios per upgrade, seed, and the distribution
+# and relative spread of each uncertain input around its estimate. Distributions
+# are fixed, normal, lognormal, triangular, or uniform.
+SIMULATION_SCENARIOS = int(os.environ.get("AEGIS_SIMULATION_SCENARIOS", "1000"))
+SIMULATION_SEED = int(os.environ.get("AEGIS_SIMULATION_SEED", "42"))
+SIMULATION_DISTRIBUTIONS = {
+    "roi": (
+        os.environ.get("AEGIS_SIMULATION_ROI_DIST", "normal"),
+        float(os.environ.get("AEGIS_SIMULATION_ROI_SPREAD", "0.15")),
+    ),
+    "maintenance_pct": (
+        os.environ.get("AEGIS_SIMULATION_MAINTENANCE_DIST", "lognormal"),
+        float(os.environ.get("AEGIS_SIMULATION_MAINTENANCE_SPREAD", "0.3")),
+    ),
+}
+
+# Draws simulated per block, and the run size (items x scenarios) above which
+# blocks are spread over a process pool of AEGIS_SIMULATION_WORKERS (0 = CPU count)
+SIMULATION_BLOCK_DRAWS = int(os.environ.get("AEGIS_SIMULATION_BLOCK_DRAWS", "4000000"))
+SIMULATION_POOL_DRAWS = int(os.environ.get("AEGIS_SIMULATION_POOL_DRAWS", "50000000"))
+SIMULATION_WORKERS = int(os.environ.get("AEGIS_SIMULATION_WORKERS", "0"))
+# Draws (items x scenarios) the dashboard simulates per selection; beyond this
+# only the costliest items are simulated, so larger selections stay interactive
+SIMULATION_MAX_DRAWS = int(os.environ.get("AEGIS_SIMULATION_MAX_DRAWS", "10000000"))
+
+# Items drawn by the Risk Bands chart, and simulation results cached per selection
+SIMULATION_CHART_ITEMS = int(os.environ.get("AEGIS_SIMULATION_CHART_ITEMS", "30"))
+SIMULATION_CACHE_ENTRIES = int(os.environ.get("AEGIS_SIMULATION_CACHE_ENTRIES", "32"))
+
+# Sensitivity analysis: how each metric input is perturbed ("relative" fraction
+# or "absolute" amount, applied in both directions), the number of grid points
+# from the low to the high perturbation, and items evaluated per block
+SENSITIVITY_PERTURBATIONS = {
+    "cost_m": ("relative", 0.10),
+    "roi": ("relative", 0.10),
+    "maintenance_pct": ("relative", 0.20),
+    "lifespan_years": ("absolute", 2),
+}
+SENSITIVITY_GRID_STEPS = int(os.environ.get("AEGIS_SENSITIVITY_GRID_STEPS", "5"))
+SENSITIVITY_BLOCK_ELEMENTS = int(os.environ.get("AEGIS_SENSITIVITY_BLOCK_ELEMENTS", "4000000"))
+
+# Cash flow projection: annual discount rate for NPV and discounted payback, and
+# item-years projected per block
+PROJECTION_DISCOUNT_RATE = float(os.environ.get("AEGIS_PROJECTION_DISCOUNT_RATE", "0.05"))
+PROJECTION_BLOCK_ELEMENTS = int(os.environ.get("AEGIS_PROJECTION_BLOCK_ELEMENTS", "1000000"))
+
+# Data table rows per page (the default of the page size select), and cached
+# sort orders and search masks
+TABLE_PAGE_SIZE = int(os.environ.get("AEGIS_TABLE_PAGE_SIZE", "25"))
+TABLE_CACHE_ENTRIES = int(os.environ.get("AEGIS_TABLE_CACHE_ENTRIES", "64"))
+
+# Bar charts plot every row up to BAR_MAX_ROWS rows; larger selections show the
+# BAR_TOP_N x values with the largest totals and sum the rest into "Other"
+BAR_TOP_N = int(os.environ.get("AEGIS_BAR_TOP_N", "20"))
+BAR_MAX_ROWS = int(os.environ.get("AEGIS_BAR_MAX_ROWS", "200"))
+
+# Worker processes for batch_render.py (0 = one per CPU)
+BATCH_WORKERS = int(os.environ.get("AEGIS_BATCH_WORKERS", "0"))
+
+# HTTP API (api.py): path prefix it is served under, rows per streamed NDJSON
+# chunk or Arrow record batch, and the most points a scatter series returns
+API_PREFIX = os.environ.get("AEGIS_API_PREFIX", "/api")
+API_CHUNK_ROWS = int(os.environ.get("AEGIS_API_CHUNK_ROWS", "50000"))
+API_SERIES_POINTS = int(os.environ.get("AEGIS_API_SERIES_POINTS", "5000"))
+
+# Rows per exported chunk: one Parquet row group, Arrow record batch, or block
+# of CSV lines
+EXPORT_CHUNK_ROWS = int(os.environ.get("AEGIS_EXPORT_CHUNK_ROWS", "100000"))
+
+# Reactive instrumentation (metrics.py): set AEGIS_METRICS=0 to turn it off,
+# the local listener and path Prometheus scrapes (kept off the public app
+# port), and the latency histogram buckets in seconds
+METRICS_ENABLED = os.environ.get("AEGIS_METRICS", "1") != "0"
+METRICS_HOST = os.environ.get("AEGIS_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("AEGIS_METRICS_PORT", "9464"))
+METRICS_PATH = os.environ.get("AEGIS_METRICS_PATH", "/metrics")
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Profiling (profiling.py): AEGIS_PROFILE=1 profiles hot functions and reactive
+# runs from startup (it can also be turned on through the admin endpoint).
+# Profiles go to PROFILE_DIR as "pstats", "folded" (sampled collapsed stacks),
+# or "both"; PROFILE_SAMPLE_RATE is the fraction of runs profiled and
+# PROFILE_INTERVAL the stack sampling period in seconds
+PROFILE_ENABLED = os.environ.get("AEGIS_PROFILE", "0") == "1"
+PROFILE_DIR = os.environ.get("AEGIS_PROFILE_DIR", "profiles")
+PROFILE_FORMAT = os.environ.get("AEGIS_PROFILE_FORMAT", "both")
+PROFILE_SAMPLE_RATE = float(os.environ.get("AEGIS_PROFILE_SAMPLE_RATE", "1.0"))
+PROFILE_INTERVAL = float(os.environ.get("AEGIS_PROFILE_INTERVAL", "0.001"))
+# Profile files written per process; later runs are not profiled
+PROFILE_MAX_FILES = int(os.environ.get("AEGIS_PROFILE_MAX_FILES", "1000"))
+
+# Token required by admin endpoints of the HTTP API (Authorization: Bearer
+# <token>); when unset the admin endpoints are disabled
+ADMIN_TOKEN = os.environ.get("AEGIS_ADMIN_TOKEN", "")
+
+# Sidebar filter changes are applied FILTER_DEBOUNCE_MS after the last change
+# (0 applies every change at once), and at least every FILTER_MAX_WAIT_MS while
+# changes keep coming
+FILTER_DEBOUNCE_MS = int(os.environ.get("AEGIS_FILTER_DEBOUNCE_MS", "250"))
+FILTER_MAX_WAIT_MS = int(os.environ.get("AEGIS_FILTER_MAX_WAIT_MS", "1000"))
+
+# Preset buttons: (departments, categories, priorities, max budget, min ROI)
+FILTER_PRESETS = {
+    "preset_full": (["Army", "Navy", "Air Force", "Marines"], ["Vehicles", "Aircraft", "Communications", "Weapons"],
+                    ["Critical", "High", "Medium"], 400, 1.0),
+    "preset_budget": (["Army", "Navy", "Air Force", "Marines"], ["Vehicles", "Aircraft", "Communications", "Weapons"],
+                      ["Critical", "High"], 200, 1.3),
+    "preset_value": (["Army", "Navy", "Air Force", "Marines"], ["Vehicles", "Aircraft", "Communications", "Weapons"],
+                     ["Critical", "High", "Medium"], 300, 1.4),
+}
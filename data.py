@@ -1,10 +1,20 @@
 """
 AEGIS Data Module
-Data generation and metric calculations
+Data generation, loading, and metric calculations
 """
 
+import os
+import threading
 import pandas as pd
 import numpy as np
+from cache import clear_caches
+from cashflow import project_cash_flows
+from profiling import profiled
+from config import (
+    BASE_SCHEMA, NUMERIC_FIELDS, DATA_SOURCE, DATA_PATH, DATA_CHUNK_ROWS, DATA_MEMORY_MAP,
+    SYNTHETIC_ROWS, SYNTHETIC_SEED,
+    DEPARTMENT_COLORS, CATEGORY_COLORS, PRIORITY_COLORS
+)
 
 
 def generate_equipment_data():
@@ -86,6 +96,153 @@ def generate_equipment_data():
     return df
 
 
+# Synthetic portfolio vocabularies and distribution parameters
+SYNTHETIC_DEPARTMENT_WEIGHTS = {'Army': 0.38, 'Navy': 0.25, 'Air Force': 0.25, 'Marines': 0.12}
+SYNTHETIC_CATEGORY_WEIGHTS = {'Vehicles': 0.27, 'Aircraft': 0.28, 'Communications': 0.2, 'Weapons': 0.25}
+SYNTHETIC_PRIORITY_WEIGHTS = {'Critical': 0.3, 'High': 0.4, 'Medium': 0.3}
+
+# Median initial cost ($M) per category; costs are log-normal around these
+SYNTHETIC_CATEGORY_COST = {'Vehicles': 48, 'Aircraft': 72, 'Communications': 42, 'Weapons': 58}
+SYNTHETIC_PRIORITY_ROI_BONUS = {'Critical': 0.25, 'High': 0.1, 'Medium': 0.0}
+
+SYNTHETIC_PLATFORMS = {
+    'Vehicles': ["M1 Abrams", "Bradley", "Stryker", "JLTV", "Amphibious Combat Vehicle", "Paladin"],
+    'Aircraft': ["F-35", "F/A-18", "CH-47 Chinook", "V-22 Osprey", "C-130 Hercules", "AH-64 Apache"],
+    'Communications': ["Satellite Array", "Tactical Data Link", "SINCGARS Radio", "Link 16 Terminal", "WIN-T Node"],
+    'Weapons': ["Patriot", "THAAD", "M777 Howitzer", "Naval Strike Missile", "Javelin", "HIMARS"],
+}
+SYNTHETIC_PROGRAMS = [
+    "Modernization", "Upgrade", "Service Life Extension", "Sensor Refit",
+    "Engine Overhaul", "Software Block Update", "Survivability Kit", "Sustainment Program",
+]
+
+# Rows generated per independently seeded block; output is identical for any chunk size
+SYNTHETIC_BLOCK_ROWS = 65536
+
+
+def _synthetic_block(seed, block, size):
+    """Generate one seeded block of synthetic portfolio columns as NumPy arrays."""
+    rng = np.random.default_rng([seed, block])
+
+    departments = list(DEPARTMENT_COLORS)
+    categories = list(CATEGORY_COLORS)
+    priorities = list(PRIORITY_COLORS)
+
+    dept_codes = rng.choice(len(departments), size=size, p=[SYNTHETIC_DEPARTMENT_WEIGHTS[d] for d in departments])
+    cat_codes = rng.choice(len(categories), size=size, p=[SYNTHETIC_CATEGORY_WEIGHTS[c] for c in categories])
+    prio_codes = rng.choice(len(priorities), size=size, p=[SYNTHETIC_PRIORITY_WEIGHTS[p] for p in priorities])
+
+    median_cost = np.array([SYNTHETIC_CATEGORY_COST[c] for c in categories], dtype=float)[cat_codes]
+    costs = np.clip(np.round(median_cost * rng.lognormal(0.0, 0.45, size), 1), 5.0, 400.0)
+
+    roi_bonus = np.array([SYNTHETIC_PRIORITY_ROI_BONUS[p] for p in priorities])[prio_codes]
+    rois = np.round(1.0 + roi_bonus + rng.gamma(4.0, 0.32, size), 2)
+
+    maintenance_pcts = np.round(np.clip(rng.beta(4.0, 60.0, size), 0.01, 0.15), 3)
+    lifespans = np.clip(np.rint(rng.normal(18.0, 3.5, size)), 8, 30).astype(np.int64)
+    ages = np.floor(rng.random(size) * lifespans).astype(np.int64)
+
+    # Names come from a per-category vocabulary so no per-row formatting is needed
+    name_vocab = np.array([
+        f"{platform} {program}"
+        for category in categories
+        for platform in SYNTHETIC_PLATFORMS[category]
+        for program in SYNTHETIC_PROGRAMS
+    ], dtype=object)
+    vocab_sizes = np.array([len(SYNTHETIC_PLATFORMS[c]) * len(SYNTHETIC_PROGRAMS) for c in categories])
+    vocab_offsets = np.concatenate(([0], np.cumsum(vocab_sizes)[:-1]))
+    names = name_vocab[vocab_offsets[cat_codes] + (rng.random(size) * vocab_sizes[cat_codes]).astype(np.int64)]
+
+    return {
+        'department': dept_codes,
+        'category': cat_codes,
+        'priority': prio_codes,
+        'upgrade_name': names,
+        'cost_m': costs,
+        'roi': rois,
+        'maintenance_pct': maintenance_pcts,
+        'age_years': ages,
+        'lifespan_years': lifespans,
+    }
+
+
+def iter_synthetic_portfolio(n_rows, chunk_rows=DATA_CHUNK_ROWS, seed=SYNTHETIC_SEED):
+    """Yield a seeded synthetic portfolio of n_rows as DataFrame chunks."""
+    if chunk_rows <= 0:
+        raise ValueError(f"chunk_rows must be positive, got {chunk_rows}")
+    id_width = max(2, len(str(n_rows)))
+    categoricals = {
+        'department': list(DEPARTMENT_COLORS),
+        'category': list(CATEGORY_COLORS),
+        'priority': list(PRIORITY_COLORS),
+    }
+
+    # Chunks advance through the blocks in order, so only the current block is kept
+    current, block_columns = None, None
+    for start in range(0, n_rows, chunk_rows):
+        stop = min(start + chunk_rows, n_rows)
+
+        # Assemble the chunk from the fixed-size seeded blocks it overlaps
+        parts = []
+        for block in range(start // SYNTHETIC_BLOCK_ROWS, (stop - 1) // SYNTHETIC_BLOCK_ROWS + 1):
+            block_start = block * SYNTHETIC_BLOCK_ROWS
+            if block != current:
+                current = block
+                block_columns = _synthetic_block(seed, block, min(SYNTHETIC_BLOCK_ROWS, n_rows - block_start))
+            columns = block_columns
+            lo, hi = max(start - block_start, 0), min(stop - block_start, SYNTHETIC_BLOCK_ROWS)
+            parts.append({name: values[lo:hi] for name, values in columns.items()})
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+        ids = pd.Series(np.arange(start + 1, stop + 1)).astype(str).str.zfill(id_width)
+        chunk = pd.DataFrame({'upgrade_id': ('U' + ids).to_numpy()}, index=pd.RangeIndex(start, stop))
+        chunk['upgrade_name'] = columns['upgrade_name']
+        for name, vocab in categoricals.items():
+            chunk[name] = pd.Categorical.from_codes(columns[name], categories=vocab)
+        for name in ['cost_m', 'roi', 'maintenance_pct', 'age_years', 'lifespan_years']:
+            chunk[name] = columns[name]
+
+        yield chunk
+
+
+def generate_synthetic_portfolio(n_rows, seed=SYNTHETIC_SEED, chunk_rows=DATA_CHUNK_ROWS):
+    """Generate a seeded synthetic portfolio of n_rows in memory."""
+    if n_rows <= 0:
+        return coerce_schema(generate_equipment_data().iloc[:0])
+    return pd.concat(iter_synthetic_portfolio(n_rows, chunk_rows, seed))
+
+
+def write_synthetic_portfolio(path, n_rows, seed=SYNTHETIC_SEED, chunk_rows=DATA_CHUNK_ROWS):
+    """Stream a seeded synthetic portfolio to a CSV, Parquet, or Arrow file chunk by chunk."""
+    fmt = FILE_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Cannot infer data format from path: {path}")
+
+    chunks = iter_synthetic_portfolio(n_rows, chunk_rows, seed)
+    if fmt == "csv":
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        return path
+
+    pa = _require_pyarrow()
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                if fmt == "parquet":
+                    import pyarrow.parquet as pq
+                    writer = pq.ParquetWriter(path, table.schema)
+                else:
+                    writer = pa.ipc.new_file(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+
+@profiled
 def calculate_metrics(df):
     """Calculate derived metrics for equipment portfolio."""
     if df.empty:
@@ -97,9 +254,228 @@ def calculate_metrics(df):
     df['net_value'] = df['lifetime_return'] - df['total_ownership_cost']
     df['value_score'] = df['net_value'] / df['cost_m']
     
+    projection = project_cash_flows(df)
+    df['npv'] = projection['npv']
+    df['payback_years'] = projection['payback_years']
+    
     return df
 
 
-# Generate base dataset on module load
-BASE_DATA = calculate_metrics(generate_equipment_data())
+def summarize_portfolio(df):
+    """Compute count, sum, mean, min, and max of every numeric field in one vectorized pass."""
+    summary = {'count': len(df), 'sum': {}, 'mean': {}, 'min': {}, 'max': {}}
+    fields = [field for field in NUMERIC_FIELDS if field in df.columns]
+    if not fields:
+        return summary
+
+    # One 2-D array reduced along the rows covers every field at once
+    values = np.column_stack([df[field].to_numpy(dtype=float) for field in fields])
+    counts = np.count_nonzero(~np.isnan(values), axis=0)
+    present = counts > 0
+    totals = np.nansum(values, axis=0)
+    lows = np.full(len(fields), np.nan)
+    highs = np.full(len(fields), np.nan)
+    if present.any():
+        lows[present] = np.nanmin(values[:, present], axis=0)
+        highs[present] = np.nanmax(values[:, present], axis=0)
+
+    for i, field in enumerate(fields):
+        summary['sum'][field] = float(totals[i])
+        summary['mean'][field] = float(totals[i] / counts[i]) if present[i] else 0.0
+        summary['min'][field] = float(lows[i]) if present[i] else None
+        summary['max'][field] = float(highs[i]) if present[i] else None
+    return summary
+
+
+def coerce_schema(df):
+    """Coerce a raw portfolio frame to the column schema calculate_metrics expects."""
+    missing = [col for col in BASE_SCHEMA if col not in df.columns]
+    if missing:
+        raise ValueError(f"Portfolio data is missing required columns: {', '.join(missing)}")
+
+    df = df[list(BASE_SCHEMA)]
+    numeric_cols = [col for col, dtype in BASE_SCHEMA.items() if dtype in ("float64", "int64")]
+    numeric = {col: pd.to_numeric(df[col], errors="coerce") for col in numeric_cols}
+
+    # Rows without usable numbers would only propagate NaN through the metrics
+    valid = np.ones(len(df), dtype=bool)
+    for values in numeric.values():
+        valid &= values.notna().to_numpy()
+
+    columns = {}
+    for col, dtype in BASE_SCHEMA.items():
+        values = numeric[col] if col in numeric else df[col]
+        if not valid.all():
+            values = values[valid].reset_index(drop=True)
+        if dtype == "str":
+            values = values.astype(str)
+        elif dtype == "category" and not isinstance(values.dtype, pd.CategoricalDtype):
+            # Keep categories in order of appearance so chart legends stay stable
+            values = values.astype(pd.CategoricalDtype(values.dropna().unique()))
+        else:
+            values = values.astype(dtype, copy=False)
+        columns[col] = values
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def _require_pyarrow():
+    """Import pyarrow or explain how to install it."""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Loading Parquet and Arrow files requires the 'pyarrow' package.\nRun: pip install pyarrow")
+    return pyarrow
+
+
+def _table_to_frame(table):
+    """Convert an Arrow table to pandas without holding both copies at once."""
+    import pyarrow as pa
+
+    # Dictionary-encode categorical fields in Arrow so pandas receives
+    # Categoricals directly instead of re-hashing millions of strings.
+    for i, field in enumerate(table.schema):
+        if BASE_SCHEMA.get(field.name) == "category" and not pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+
+    # split_blocks keeps non-null numeric columns zero-copy (including over a
+    # memory map) and self_destruct releases Arrow buffers as columns convert.
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def load_synthetic(path=None, chunk_rows=DATA_CHUNK_ROWS):
+    """Load the built-in synthetic dataset, or a generated one when SYNTHETIC_ROWS is set."""
+    if SYNTHETIC_ROWS > 0:
+        return generate_synthetic_portfolio(SYNTHETIC_ROWS, chunk_rows=chunk_rows)
+    return generate_equipment_data()
+
+
+def load_csv(path, chunk_rows=DATA_CHUNK_ROWS):
+    """Load a CSV portfolio in chunks."""
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        pa = None
+
+    if pa is None:
+        chunks = pd.read_csv(path, usecols=list(BASE_SCHEMA), chunksize=chunk_rows)
+        return pd.concat((coerce_schema(chunk) for chunk in chunks), ignore_index=True)
+
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=max(chunk_rows, 1) * 256),
+        convert_options=pa_csv.ConvertOptions(include_columns=list(BASE_SCHEMA)),
+    )
+    table = pa.Table.from_batches(list(reader), schema=reader.schema)
+    return _table_to_frame(table)
+
+
+def load_parquet(path, chunk_rows=DATA_CHUNK_ROWS):
+    """Load a Parquet portfolio in row batches, memory-mapping the file when enabled."""
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path, memory_map=DATA_MEMORY_MAP)
+    batches = list(parquet_file.iter_batches(batch_size=chunk_rows, columns=list(BASE_SCHEMA)))
+    if not batches:
+        return parquet_file.schema_arrow.empty_table().to_pandas()
+    return _table_to_frame(pa.Table.from_batches(batches))
+
+
+def load_arrow(path, chunk_rows=DATA_CHUNK_ROWS):
+    """Load an Arrow IPC (Feather v2) portfolio, memory-mapping the file when enabled."""
+    pa = _require_pyarrow()
+
+    source = pa.memory_map(path, "r") if DATA_MEMORY_MAP else pa.OSFile(path, "rb")
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        source.seek(0)
+        reader = pa.ipc.open_stream(source)
+        batches = iter(reader)
+    table = pa.Table.from_batches(list(batches), schema=reader.schema)
+    return _table_to_frame(table.select(list(BASE_SCHEMA)))
+
+
+LOADERS = {
+    "synthetic": load_synthetic,
+    "csv": load_csv,
+    "parquet": load_parquet,
+    "arrow": load_arrow,
+}
+
+FILE_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+
+def load_portfolio(source=None, path=None, chunk_rows=DATA_CHUNK_ROWS):
+    """Load raw portfolio records from the configured data source."""
+    source = (source if source is not None else DATA_SOURCE).strip().lower()
+    path = path if path is not None else DATA_PATH
+
+    if not source:
+        source = FILE_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "") if path else "synthetic"
+        if not source:
+            raise ValueError(f"Cannot infer data format from path: {path}")
+
+    loader = LOADERS.get(source)
+    if loader is None:
+        raise ValueError(f"Unknown data source '{source}'. Must be one of: {', '.join(LOADERS)}")
+    if source != "synthetic" and not path:
+        raise ValueError(f"Data source '{source}' requires a file path (set AEGIS_DATA_PATH)")
+
+    return coerce_schema(loader(path, chunk_rows=chunk_rows))
+
+
+# (version, frame) is swapped as one tuple so readers never pair a version with the wrong data.
+# Nothing is loaded at import time; the first reader materializes the dataset.
+_BASE = None
+_RELOAD_LOCK = threading.Lock()
+
+
+def get_base_data():
+    """Return the current base dataset."""
+    return get_versioned_base_data()[1]
+
+
+def get_versioned_base_data():
+    """Return (dataset version, base dataset) as a consistent pair, loading it on first use."""
+    base = _BASE
+    if base is None:
+        base = _load_base_data()
+    return base
+
+
+def _load_base_data():
+    """Load the configured dataset once, however many threads ask for it at the same time."""
+    global _BASE
+    with _RELOAD_LOCK:
+        if _BASE is None:
+            _BASE = (1, calculate_metrics(load_portfolio()))
+        return _BASE
+
+
+def reload_base_data(source=None, path=None):
+    """Reload the base dataset from its source and bump the dataset version."""
+    global _BASE
+    with _RELOAD_LOCK:
+        df = calculate_metrics(load_portfolio(source, path))
+        _BASE = ((_BASE[0] if _BASE else 0) + 1, df)
+    # Results keyed on the old version can never be served again; free them now
+    clear_caches()
+    return df
+
 
+def __getattr__(name):
+    """Keep `data.BASE_DATA` working now that the dataset is loaded lazily."""
+    if name == "BASE_DATA":
+        return get_base_data()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
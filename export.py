@@ -0,0 +1,101 @@
+"""
+AEGIS Export
+Stream a selection to Parquet, Arrow, or CSV in row chunks without building the file in memory
+"""
+
+import importlib.util
+import time
+from config import EXPORT_CHUNK_ROWS
+
+
+# Export formats: key -> (label, file extension, media type, needs pyarrow)
+EXPORT_FORMATS = {
+    "parquet": ("Parquet", ".parquet", "application/vnd.apache.parquet", True),
+    "arrow": ("Arrow IPC", ".arrow", "application/vnd.apache.arrow.file", True),
+    "csv": ("CSV", ".csv", "text/csv", False),
+}
+
+
+class ChunkSink:
+    """Write-only file object that collects writer output until it is drained."""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _has_pyarrow():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def resolve_format(fmt):
+    """Return the format to write: fmt, or CSV when fmt needs pyarrow and it is not installed."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(EXPORT_FORMATS)}")
+    if EXPORT_FORMATS[fmt][3] and not _has_pyarrow():
+        return "csv"
+    return fmt
+
+
+def export_filename(fmt, prefix="aegis_selection"):
+    """Return a timestamped download filename for a format."""
+    return f"{prefix}_{time.strftime('%Y%m%d-%H%M%S')}{EXPORT_FORMATS[fmt][1]}"
+
+
+def iter_export(df, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield df encoded as fmt ("parquet", "arrow", or "csv") in chunks of bytes.
+
+    Each chunk of chunk_rows rows is converted to Arrow on its own and written
+    as one Parquet row group, one Arrow record batch, or one block of CSV
+    lines, so only one chunk is held in memory at a time. Numeric columns keep
+    their raw values; categorical fields are written dictionary-encoded.
+    Without pyarrow, CSV is written by pandas, chunk by chunk.
+    """
+    fmt = resolve_format(fmt)
+    chunk_rows = max(1, int(chunk_rows))
+    if fmt == "csv" and not _has_pyarrow():
+        yield from _iter_pandas_csv(df, chunk_rows)
+    else:
+        yield from _iter_arrow(df, fmt, chunk_rows)
+
+
+def _iter_pandas_csv(df, chunk_rows):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode("utf-8")
+
+
+def _iter_arrow(df, fmt, chunk_rows):
+    import pyarrow as pa
+
+    sink = ChunkSink()
+    schema = pa.Schema.from_pandas(df.iloc[:chunk_rows], preserve_index=False)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema)
+    elif fmt == "arrow":
+        writer = pa.ipc.new_file(sink, schema)
+    else:
+        import pyarrow.csv as pcsv
+        writer = pcsv.CSVWriter(sink, schema)
+
+    with writer:
+        for start in range(0, len(df), chunk_rows):
+            # Converting against the first chunk's schema keeps types stable when
+            # a later chunk is all missing values
+            chunk = pa.Table.from_pandas(df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False)
+            writer.write_table(chunk)
+            yield sink.drain()
+    yield sink.drain()
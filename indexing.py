@@ -0,0 +1,142 @@
+"""
+AEGIS Indexing
+Precomputed bitmap and sorted range indexes over portfolio frames for fast filtering
+"""
+
+import numpy as np
+import pandas as pd
+from cache import object_memo
+from config import NUMERIC_FIELDS
+
+
+INDEXED_CATEGORICAL_FIELDS = ["department", "category", "priority"]
+
+# A range predicate matching at most this fraction of rows drives the selection
+# from its sorted positions; wider ones are applied as a mask instead.
+SPARSE_RANGE_FRACTION = 0.25
+
+
+class PortfolioIndex:
+    """Packed bitmap and sorted range index over the filter fields of one frame.
+
+    Frames are treated as immutable once indexed; BASE_DATA is never modified
+    in place, so its index stays valid for the life of the process.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.bitmaps = {
+            field: _build_bitmaps(df[field])
+            for field in INDEXED_CATEGORICAL_FIELDS if field in df.columns
+        }
+        self.columns = {
+            field: df[field].to_numpy(dtype=float)
+            for field in NUMERIC_FIELDS if field in df.columns
+        }
+        # field -> (row order, sorted values, non-NaN count), built on first range query
+        self.sorted = {}
+
+    def empty_bits(self):
+        """Return an all-zero packed bitmap sized for this frame."""
+        return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+
+    def categorical_bits(self, selections):
+        """Return packed bits for rows matching every {field: values} selection.
+
+        Values are ORed within a field and fields are ANDed together. Fields
+        with an empty selection are not filtered, matching filter_data. Returns
+        None when no field restricts the selection.
+        """
+        result = None
+        for field, values in selections.items():
+            if not values:
+                continue
+            bitmaps = self.bitmaps[field]
+            field_bits = self.empty_bits()
+            for value in set(values):
+                bits = bitmaps.get(value)
+                if bits is not None:
+                    np.bitwise_or(field_bits, bits, out=field_bits)
+            result = field_bits if result is None else np.bitwise_and(result, field_bits, out=result)
+        return result
+
+    def unpack(self, bits):
+        """Expand packed bits into a boolean row mask."""
+        return np.unpackbits(bits, count=self.n_rows).view(bool)
+
+    def sorted_column(self, field):
+        """Return (row order, sorted values, non-NaN count) for a numeric field."""
+        entry = self.sorted.get(field)
+        if entry is None:
+            values = self.columns[field]
+            order = np.argsort(values, kind='stable')
+            sorted_values = values[order]
+            # NaN sorts last and never satisfies a range predicate
+            valid = len(sorted_values) - int(np.count_nonzero(np.isnan(sorted_values)))
+            entry = self.sorted[field] = (order, sorted_values, valid)
+        return entry
+
+    def range_span(self, field, low=None, high=None):
+        """Return the [start, stop) slice of the sorted order with low <= value <= high."""
+        _, sorted_values, valid = self.sorted_column(field)
+        # No value compares true against a NaN bound, so the range is empty
+        if (low is not None and np.isnan(low)) or (high is not None and np.isnan(high)):
+            return 0, 0
+        start = 0 if low is None else int(np.searchsorted(sorted_values[:valid], low, side='left'))
+        stop = valid if high is None else int(np.searchsorted(sorted_values[:valid], high, side='right'))
+        return start, max(start, stop)
+
+    def select(self, categorical=None, ranges=None):
+        """Return sorted row positions matching categorical selections and numeric ranges.
+
+        categorical maps fields to lists of accepted values (see categorical_bits);
+        ranges is a list of (field, low, high) inclusive bounds, where None leaves
+        that side open.
+        """
+        bits = self.categorical_bits(categorical or {})
+        spans = [(field, low, high, self.range_span(field, low, high)) for field, low, high in (ranges or [])]
+
+        if not spans:
+            if bits is None:
+                return np.arange(self.n_rows)
+            return np.flatnonzero(self.unpack(bits))
+
+        # Drive the selection from the most selective range when it is narrow
+        spans.sort(key=lambda span: span[3][1] - span[3][0])
+        field, _, _, (start, stop) = spans[0]
+        if stop - start <= self.n_rows * SPARSE_RANGE_FRACTION:
+            rows = np.sort(self.sorted_column(field)[0][start:stop])
+            for field, low, high, _ in spans[1:]:
+                values = self.columns[field][rows]
+                keep = ~np.isnan(values)
+                if low is not None:
+                    keep &= values >= low
+                if high is not None:
+                    keep &= values <= high
+                rows = rows[keep]
+            if bits is not None:
+                rows = rows[(bits[rows >> 3] >> (7 - (rows & 7))) & 1 == 1]
+            return rows
+
+        # Wide ranges: clear the rows outside each span rather than comparing every value
+        mask = np.ones(self.n_rows, dtype=bool) if bits is None else self.unpack(bits)
+        for field, _, _, (start, stop) in spans:
+            order = self.sorted_column(field)[0]
+            mask[order[:start]] = False
+            mask[order[stop:]] = False
+        return np.flatnonzero(mask)
+
+
+def _build_bitmaps(series):
+    """Build one packed bitmap per distinct value of a column."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    return {value: np.packbits(codes == code) for code, value in enumerate(uniques)}
+
+
+def get_index(df):
+    """Return the index for a frame, building and caching it on first use."""
+    return object_memo(df, 'index', lambda: PortfolioIndex(df))
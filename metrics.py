@@ -0,0 +1,217 @@
+"""
+AEGIS Metrics
+Latency histograms, call counts, and error counts for reactives, cache statistics,
+and active sessions, exposed in Prometheus text format on a local listener
+"""
+
+import functools
+import inspect
+import threading
+import time
+import warnings
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import METRICS_ENABLED, METRICS_BUCKETS, METRICS_HOST, METRICS_PORT, METRICS_PATH
+from profiling import is_profiling, profile_call
+
+
+# (kind, name) -> [count per bucket (the last is +Inf), total seconds, errors]
+_SERIES = {}
+_LOCK = threading.Lock()
+_sessions = 0
+_server = None
+
+
+def observe(kind, name, seconds, error=False):
+    """Record one run of a reactive taking seconds."""
+    slot = bisect_left(METRICS_BUCKETS, seconds)
+    with _LOCK:
+        series = _SERIES.get((kind, name))
+        if series is None:
+            series = _SERIES[(kind, name)] = [[0] * (len(METRICS_BUCKETS) + 1), 0.0, 0]
+        series[0][slot] += 1
+        series[1] += seconds
+        series[2] += error
+
+
+def _is_error(e):
+    """Return False for Shiny's silent exceptions (req(), cancelled outputs), which are control flow."""
+    from shiny.types import SilentException, SilentCancelOutputException, SilentOperationInProgressException
+
+    return not isinstance(e, (SilentException, SilentCancelOutputException, SilentOperationInProgressException))
+
+
+def instrument(kind, name=None):
+    """Decorate a reactive function (sync, async, or generator) to record its latency and errors.
+
+    kind labels what it is ("calc", "effect", or "output"); name defaults to the
+    function name. Place it directly above the function, under the reactive or
+    render decorators. A generator (such as a download) is timed until it is
+    exhausted. While profiling is on, sync runs are also profiled (see
+    profiling.py), whether or not metrics are enabled. When metrics are
+    disabled, async and generator functions are returned as is.
+    """
+    def decorator(fn):
+        label = name or fn.__name__
+        if not METRICS_ENABLED:
+            if inspect.iscoroutinefunction(fn) or inspect.isgeneratorfunction(fn):
+                return fn
+
+            @functools.wraps(fn)
+            def untimed(*args, **kwargs):
+                if is_profiling():
+                    return profile_call(f"{kind}.{label}", fn, *args, **kwargs)
+                return fn(*args, **kwargs)
+            return untimed
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                error = False
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as e:
+                    error = _is_error(e)
+                    raise
+                finally:
+                    observe(kind, label, time.perf_counter() - start, error)
+        elif inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                error = False
+                try:
+                    yield from fn(*args, **kwargs)
+                except Exception as e:
+                    error = _is_error(e)
+                    raise
+                finally:
+                    observe(kind, label, time.perf_counter() - start, error)
+        else:
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                error = False
+                try:
+                    if is_profiling():
+                        return profile_call(f"{kind}.{label}", fn, *args, **kwargs)
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    error = _is_error(e)
+                    raise
+                finally:
+                    observe(kind, label, time.perf_counter() - start, error)
+        return timed
+
+    return decorator
+
+
+def track_session(session):
+    """Count a session as active until it ends."""
+    global _sessions
+    with _LOCK:
+        _sessions += 1
+
+    def ended():
+        global _sessions
+        with _LOCK:
+            _sessions -= 1
+
+    session.on_ended(ended)
+
+
+def snapshot():
+    """Return a consistent copy of the reactive series and the active session count."""
+    with _LOCK:
+        series = {key: (list(buckets), total, errors) for key, (buckets, total, errors) in _SERIES.items()}
+        return series, _sessions
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{str(value)}"' for key, value in labels.items()) + "}"
+
+
+def render_metrics():
+    """Return every metric in Prometheus text exposition format."""
+    from cache import cache_stats
+
+    series, sessions = snapshot()
+    lines = [
+        "# HELP aegis_reactive_duration_seconds Time spent running each reactive calculation, effect, and output.",
+        "# TYPE aegis_reactive_duration_seconds histogram",
+    ]
+    for (kind, name), (buckets, total, _) in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip(list(METRICS_BUCKETS) + ["+Inf"], buckets):
+            cumulative += count
+            lines.append(f"aegis_reactive_duration_seconds_bucket{_labels(kind=kind, name=name, le=bound)} {cumulative}")
+        lines.append(f"aegis_reactive_duration_seconds_sum{_labels(kind=kind, name=name)} {total!r}")
+        lines.append(f"aegis_reactive_duration_seconds_count{_labels(kind=kind, name=name)} {cumulative}")
+
+    lines += [
+        "# HELP aegis_reactive_errors_total Runs of each reactive that raised an error.",
+        "# TYPE aegis_reactive_errors_total counter",
+    ]
+    for (kind, name), (_, _, errors) in sorted(series.items()):
+        lines.append(f"aegis_reactive_errors_total{_labels(kind=kind, name=name)} {errors}")
+
+    lines += [
+        "# HELP aegis_active_sessions Connected Shiny sessions.",
+        "# TYPE aegis_active_sessions gauge",
+        f"aegis_active_sessions {sessions}",
+    ]
+
+    caches = cache_stats()
+    for metric, key, kind, description in (
+        ("aegis_cache_entries", 'entries', "gauge", "Entries held by each cache."),
+        ("aegis_cache_bytes", 'bytes', "gauge", "Approximate bytes held by each cache."),
+        ("aegis_cache_hits_total", 'hits', "counter", "Cache lookups that found an entry."),
+        ("aegis_cache_misses_total", 'misses', "counter", "Cache lookups that found no entry."),
+        ("aegis_cache_evictions_total", 'evictions', "counter", "Entries evicted to stay within bounds."),
+    ):
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+        lines += [f"{metric}{_labels(cache=stats['name'])} {stats[key]}" for stats in caches]
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Answer GET METRICS_PATH with render_metrics() and anything else with 404."""
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != METRICS_PATH:
+            self.send_error(404)
+            return
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve the metrics on their own listener in a daemon thread, apart from the public app port.
+
+    The listener binds to METRICS_HOST (default 127.0.0.1), so reactive names,
+    session counts, and cache sizes are not exposed to dashboard users. It is
+    started once per process; returns the server, or None when metrics are
+    disabled or the port is taken (e.g. by another worker).
+    """
+    global _server
+    if not METRICS_ENABLED:
+        return None
+    with _LOCK:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                warnings.warn(f"Metrics listener not started on {host}:{port}: {e}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="aegis-metrics", daemon=True).start()
+        return _server
@@ -0,0 +1,230 @@
+"""
+AEGIS Optimizer
+Budget-constrained portfolio selection (0/1 knapsack) over the filtered upgrades
+"""
+
+import bisect
+import time
+import numpy as np
+from config import (
+    OPTIMIZER_COST_RESOLUTION, OPTIMIZER_DP_CELLS,
+    OPTIMIZER_EXACT_ITEMS, OPTIMIZER_MAX_NODES
+)
+
+
+# Objective name -> (display name, column summed over the selection)
+OBJECTIVES = {
+    "net_value": ("Net Value", "net_value"),
+    "lifetime_return": ("Lifetime Return", "lifetime_return"),
+    "value_score": ("Value Score", "value_score"),
+}
+
+OPTIMIZER_METHODS = {
+    "auto": "Auto",
+    "dp": "Dynamic programming",
+    "branch_and_bound": "Branch and bound",
+    "greedy": "Greedy heuristic",
+}
+
+
+def optimize_portfolio(df, budget, objective="net_value", method="auto"):
+    """Select the upgrades maximizing the summed objective with total cost within budget.
+
+    method "auto" solves exactly with dynamic programming when costs sit on the
+    OPTIMIZER_COST_RESOLUTION grid and the table fits in OPTIMIZER_DP_CELLS,
+    with branch and bound for up to OPTIMIZER_EXACT_ITEMS candidates otherwise,
+    and with the greedy ratio heuristic beyond that.
+
+    Returns a dict with 'rows' (positions into df), 'selection', 'total_value',
+    'total_cost', 'upper_bound' (the LP relaxation bound), 'optimal', the
+    'method' used, the number of 'candidates', and 'solve_ms'.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}'. Choose from: {', '.join(OBJECTIVES)}")
+    if method not in OPTIMIZER_METHODS:
+        raise ValueError(f"Unknown method '{method}'. Choose from: {', '.join(OPTIMIZER_METHODS)}")
+
+    start = time.perf_counter()
+    budget = max(float(budget or 0), 0.0)
+    values = df[OBJECTIVES[objective][1]].to_numpy(dtype=float)
+    costs = df['cost_m'].to_numpy(dtype=float)
+
+    # Items that cannot improve the objective or can never fit are never chosen
+    candidates = np.flatnonzero((values > 0) & (costs <= budget) & ~np.isnan(costs))
+    free = candidates[costs[candidates] <= 0]
+    candidates = candidates[costs[candidates] > 0]
+    v, c = values[candidates], costs[candidates]
+
+    if method == "auto":
+        method = _choose_method(c, budget)
+
+    if len(candidates) == 0:
+        chosen, optimal = np.empty(0, dtype=np.int64), True
+    elif method == "dp":
+        chosen, optimal = knapsack_dp(v, c, budget, OPTIMIZER_COST_RESOLUTION), _on_grid(c)
+    elif method == "branch_and_bound":
+        chosen, optimal = knapsack_branch_and_bound(v, c, budget, OPTIMIZER_MAX_NODES)
+    else:
+        chosen, optimal = knapsack_greedy(v, c, budget), False
+
+    rows = np.sort(np.concatenate((free, candidates[chosen])))
+    total_value = float(values[rows].sum())
+    upper_bound = float(values[free].sum()) + lp_bound(v, c, budget)
+    # A heuristic result that reaches the bound is optimal after all
+    optimal = optimal or total_value >= upper_bound - 1e-9 * max(1.0, abs(upper_bound))
+
+    return {
+        'objective': objective,
+        'budget': budget,
+        'rows': rows,
+        'selection': df.take(rows),
+        'total_value': total_value,
+        'total_cost': float(costs[rows].sum()),
+        'upper_bound': upper_bound,
+        'optimal': bool(optimal),
+        'method': method,
+        'candidates': int(len(candidates) + len(free)),
+        'solve_ms': (time.perf_counter() - start) * 1000,
+    }
+
+
+def _on_grid(costs, resolution=OPTIMIZER_COST_RESOLUTION):
+    """Return True when every cost is a whole multiple of the DP cost resolution."""
+    units = costs / resolution
+    return bool(np.all(np.abs(units - np.round(units)) < 1e-6))
+
+
+def _choose_method(costs, budget):
+    """Pick the exact solver that fits the problem, or the greedy heuristic."""
+    cells = len(costs) * (int(budget / OPTIMIZER_COST_RESOLUTION + 1e-6) + 1)
+    if cells <= OPTIMIZER_DP_CELLS and _on_grid(costs):
+        return "dp"
+    if len(costs) <= OPTIMIZER_EXACT_ITEMS:
+        return "branch_and_bound"
+    return "greedy"
+
+
+def knapsack_dp(values, costs, budget, resolution=OPTIMIZER_COST_RESOLUTION):
+    """Solve the 0/1 knapsack exactly on costs discretized to `resolution`.
+
+    Costs are rounded up to the grid, so the result always fits the budget; it
+    is optimal when the costs already sit on the grid. Returns the positions of
+    the chosen items.
+    """
+    capacity = int(budget / resolution + 1e-6)
+    weights = np.ceil(costs / resolution - 1e-6).astype(np.int64)
+    best = np.zeros(capacity + 1)
+    taken = np.zeros((len(values), capacity + 1), dtype=bool)
+
+    for i, (weight, value) in enumerate(zip(weights, values)):
+        if weight > capacity:
+            continue
+        # Candidate values come from the previous row, so each item is used at most once
+        candidate = best[:capacity + 1 - weight] + value
+        improved = candidate > best[weight:]
+        taken[i, weight:] = improved
+        best[weight:][improved] = candidate[improved]
+
+    chosen = []
+    room = capacity
+    for i in range(len(values) - 1, -1, -1):
+        if taken[i, room]:
+            chosen.append(i)
+            room -= weights[i]
+    return np.array(chosen[::-1], dtype=np.int64)
+
+
+def knapsack_branch_and_bound(values, costs, budget, max_nodes=OPTIMIZER_MAX_NODES):
+    """Solve the 0/1 knapsack exactly by depth-first branch and bound.
+
+    Items are explored in value density order and pruned with the fractional
+    (LP) bound. Returns (positions of the chosen items, proven optimal); the
+    search stops at max_nodes and then returns the best selection found.
+    """
+    order = np.argsort(-values / costs, kind='stable')
+    v, c = values[order].tolist(), costs[order].tolist()
+    n = len(v)
+    cum_c = np.concatenate(([0.0], np.cumsum(costs[order]))).tolist()
+    cum_v = np.concatenate(([0.0], np.cumsum(values[order]))).tolist()
+
+    def bound(i, value, room):
+        # Items i..k-1 fit whole; item k fills the remaining room fractionally
+        # The same relative tolerance as the fit test, so exact fits survive float error
+        k = bisect.bisect_right(cum_c, (cum_c[i] + room) * (1 + 1e-12), lo=i) - 1
+        total = value + cum_v[k] - cum_v[i]
+        if k < n:
+            total += v[k] * (cum_c[i] + room - cum_c[k]) / c[k]
+        return total
+
+    # Start from the greedy selection so pruning is effective right away
+    best_items = knapsack_greedy(values[order], costs[order], budget).tolist()
+    best_value = sum(v[i] for i in best_items)
+
+    # Stack of (next item, value so far, room left, chosen items as a linked tuple)
+    stack = [(0, 0.0, budget, None)]
+    nodes = 0
+    while stack:
+        if nodes >= max_nodes:
+            return np.sort(order[best_items]), False
+        i, value, room, chosen = stack.pop()
+        nodes += 1
+        if value > best_value:
+            best_value, best_items = value, _unlink(chosen)
+        if i == n or bound(i, value, room) <= best_value + 1e-12:
+            continue
+        stack.append((i + 1, value, room, chosen))
+        if c[i] <= room * (1 + 1e-12):
+            stack.append((i + 1, value + v[i], room - c[i], (i, chosen)))
+
+    return np.sort(order[best_items]), True
+
+
+def _unlink(chosen):
+    """Expand a linked (item, parent) tuple into a list of items."""
+    items = []
+    while chosen is not None:
+        items.append(chosen[0])
+        chosen = chosen[1]
+    return items
+
+
+def knapsack_greedy(values, costs, budget):
+    """Fill the budget in value density order, skipping items that no longer fit.
+
+    Runs in O(n log n) with vectorized passes. The best single item is returned
+    instead when it beats the greedy fill, which bounds the result at half the
+    optimum or better. Returns the positions of the chosen items.
+    """
+    order = np.argsort(-values / costs, kind='stable')
+    chosen = []
+    room = budget
+    remaining = order
+    while len(remaining):
+        cumulative = np.cumsum(costs[remaining])
+        fit = int(np.searchsorted(cumulative, room * (1 + 1e-12), side='right'))
+        chosen.append(remaining[:fit])
+        if fit:
+            room -= cumulative[fit - 1]
+        # The item that broke the prefix is skipped; retry the rest that still fit
+        rest = remaining[fit + 1:]
+        remaining = rest[costs[rest] <= room * (1 + 1e-12)]
+
+    chosen = np.concatenate(chosen) if chosen else np.empty(0, dtype=np.int64)
+    best_single = int(np.argmax(values))
+    if values[best_single] > values[chosen].sum():
+        return np.array([best_single], dtype=np.int64)
+    return np.sort(chosen)
+
+
+def lp_bound(values, costs, budget):
+    """Return the optimum of the fractional relaxation, an upper bound on any selection."""
+    if len(values) == 0:
+        return 0.0
+    order = np.argsort(-values / costs, kind='stable')
+    cumulative = np.cumsum(costs[order])
+    fit = int(np.searchsorted(cumulative, budget, side='right'))
+    total = float(values[order[:fit]].sum())
+    if fit < len(order):
+        room = budget - (cumulative[fit - 1] if fit else 0.0)
+        total += values[order[fit]] * room / costs[order[fit]]
+    return total
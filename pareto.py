@@ -0,0 +1,105 @@
+"""
+AEGIS Pareto Frontier
+Non-dominated upgrades across cost, value, return, and age objectives
+"""
+
+import numpy as np
+
+
+# Whether each numeric field is better when lower ("min") or higher ("max")
+OBJECTIVE_DIRECTIONS = {
+    "cost_m": "min",
+    "roi": "max",
+    "maintenance_pct": "min",
+    "age_years": "min",
+    "lifespan_years": "max",
+    "total_ownership_cost": "min",
+    "lifetime_return": "max",
+    "net_value": "max",
+    "value_score": "max",
+    "npv": "max",
+    "payback_years": "min",
+}
+
+# Objectives of the portfolio-wide frontier ("show_frontier": "skyline")
+PARETO_FIELDS = ["total_ownership_cost", "net_value", "roi", "age_years"]
+
+FRONTIER_MODES = ["xy", "skyline"]
+
+
+def frontier_mode(show_frontier):
+    """Map a chart's show_frontier setting (bool or mode name) to a mode, or None."""
+    if show_frontier is True:
+        return "xy"
+    if isinstance(show_frontier, str) and show_frontier.lower() in FRONTIER_MODES:
+        return show_frontier.lower()
+    return None
+
+
+def pareto_front(values, directions):
+    """Return the sorted positions of the non-dominated rows of an (n, d) array.
+
+    directions holds "min" or "max" per column. A row is dominated when another
+    row is at least as good in every column and better in one, so exact
+    duplicates of a frontier row are on the frontier too. Rows with NaN are
+    never on it. Two objectives use an O(n log n) sweep, more use skyline().
+    """
+    values = np.asarray(values, dtype=float)
+    signs = np.array([1.0 if d == "min" else -1.0 for d in directions])
+    points = values * signs
+    valid = np.flatnonzero(~np.isnan(points).any(axis=1))
+    points = points[valid]
+
+    if len(points) == 0:
+        return valid
+    if points.shape[1] == 1:
+        return valid[points[:, 0] == points[:, 0].min()]
+    if points.shape[1] == 2:
+        return valid[pareto_front_2d(points[:, 0], points[:, 1])]
+    return valid[skyline(points)]
+
+
+def pareto_front_2d(a, b):
+    """Return the sorted positions of the non-dominated points, minimizing both a and b.
+
+    After sorting by a (ties by b), a point is on the frontier exactly when its
+    b is below every b before it, which one running minimum finds.
+    """
+    order = np.lexsort((b, a))
+    a_sorted, b_sorted = a[order], b[order]
+    best_before = np.minimum.accumulate(np.concatenate(([np.inf], b_sorted[:-1])))
+    on_front = b_sorted < best_before
+
+    # Duplicates of a frontier point share its status rather than being dominated by it
+    first = np.concatenate(([True], (a_sorted[1:] != a_sorted[:-1]) | (b_sorted[1:] != b_sorted[:-1])))
+    on_front = on_front[np.flatnonzero(first)][np.cumsum(first) - 1]
+    return np.sort(order[on_front])
+
+
+def skyline(points):
+    """Return the sorted positions of the non-dominated points, minimizing every column.
+
+    Repeatedly takes the remaining point with the lowest normalized sum, which
+    no remaining point can dominate, and discards everything it dominates.
+    Each pass is one vectorized comparison over the survivors, and the first
+    few passes discard almost all of the data.
+    """
+    low, high = points.min(axis=0), points.max(axis=0)
+    span = np.where(high > low, high - low, 1.0)
+    scores = ((points - low) / span).sum(axis=1)
+
+    rows = np.arange(len(points))
+    skyline_rows = []
+    while len(rows):
+        best = int(np.argmin(scores))
+        point = points[best]
+        skyline_rows.append(rows[best])
+        keep = ~((points >= point).all(axis=1) & (points > point).any(axis=1))
+        keep[best] = False
+        rows, points, scores = rows[keep], points[keep], scores[keep]
+    return np.sort(np.array(skyline_rows, dtype=np.int64))
+
+
+def frontier_rows(df, fields):
+    """Return the positions of the rows of df on the Pareto frontier of the given fields."""
+    return pareto_front(df[fields].to_numpy(dtype=float), [OBJECTIVE_DIRECTIONS[f] for f in fields])
@@ -0,0 +1,100 @@
+"""
+AEGIS Startup Profiler
+Import time per module for the app entry point, checked against a startup budget
+
+Usage:
+    python profile_startup.py                        # top modules and packages
+    python profile_startup.py --top 40 --json startup.json
+    python profile_startup.py --budget-ms 800        # exit 1 when over budget
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from config import STARTUP_BUDGET_MS
+
+
+def profile_imports(module="app"):
+    """Import a module in a fresh interpreter and return (per-module records, wall ms)."""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing '{module}' failed:\n{completed.stderr}")
+    return parse_importtime(completed.stderr), wall_ms
+
+
+def parse_importtime(output):
+    """Parse `python -X importtime` output into records with self and cumulative ms."""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        records.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return records
+
+
+def package_totals(records):
+    """Sum the self time of every module by its top-level package."""
+    totals = defaultdict(float)
+    for record in records:
+        totals[record['module'].split(".")[0]] += record['self_ms']
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report AEGIS import time per module and check it against a budget.")
+    parser.add_argument("--module", default="app", help="entry point module to import")
+    parser.add_argument("--top", type=int, default=20, help="number of modules and packages to list")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="import time budget in ms")
+    parser.add_argument("--json", help="write machine-readable results to this path")
+    args = parser.parse_args(argv)
+
+    records, wall_ms = profile_imports(args.module)
+    entry = next((r for r in records if r['module'] == args.module), None)
+    import_ms = entry['cumulative_ms'] if entry else sum(r['self_ms'] for r in records)
+    packages = package_totals(records)
+
+    print(f"Slowest modules importing '{args.module}' (self / cumulative ms)")
+    for r in sorted(records, key=lambda r: r['self_ms'], reverse=True)[:args.top]:
+        print(f"  {r['module']:<55} {r['self_ms']:>9.1f} {r['cumulative_ms']:>10.1f}")
+
+    print("\nSelf time by package (ms)")
+    for name, total in packages[:args.top]:
+        print(f"  {name:<55} {total:>9.1f}")
+
+    within_budget = import_ms <= args.budget_ms
+    print(f"\nImport time: {import_ms:.1f} ms (process wall time {wall_ms:.1f} ms), "
+          f"budget {args.budget_ms:.0f} ms: {'OK' if within_budget else 'OVER BUDGET'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                'module': args.module,
+                'import_ms': round(import_ms, 3),
+                'wall_ms': round(wall_ms, 3),
+                'budget_ms': args.budget_ms,
+                'within_budget': within_budget,
+                'packages': [{'package': name, 'self_ms': round(total, 3)} for name, total in packages],
+                'modules': records,
+            }, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    return 0 if within_budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+AEGIS Profiling
+Opt-in cProfile and sampled stack profiles of hot functions and reactive runs, labeled by session
+
+Turn it on with AEGIS_PROFILE=1 or at runtime through the admin endpoint of the
+HTTP API. Each profiled call writes PROFILE_DIR/<session>/<time>-<seq>-<name>
+as .pstats (cProfile, for pstats or snakeviz) and/or .folded (sampled
+collapsed stacks, for flamegraph.pl or speedscope).
+"""
+
+import cProfile
+import functools
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from config import (
+    PROFILE_ENABLED, PROFILE_DIR, PROFILE_FORMAT, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL, PROFILE_MAX_FILES
+)
+
+
+_state = {'enabled': PROFILE_ENABLED, 'session': None, 'written': 0, 'files': 0}
+_local = threading.local()
+_sequence = itertools.count()
+_lock = threading.Lock()
+_sampler = None
+
+
+def set_profiling(enabled, session=None):
+    """Turn profiling on or off, optionally for one session id only."""
+    _state['enabled'] = bool(enabled)
+    _state['session'] = session or None
+    return profiling_status()
+
+
+def profiling_status():
+    """Return whether profiling is on, for which session, and where profiles are written."""
+    return {
+        'enabled': _state['enabled'],
+        'session': _state['session'],
+        'directory': os.path.abspath(PROFILE_DIR),
+        'format': PROFILE_FORMAT,
+        'sample_rate': PROFILE_SAMPLE_RATE,
+        'written': _state['written'],
+        'files': _state['files'],
+        'max_files': PROFILE_MAX_FILES,
+    }
+
+
+def is_profiling():
+    """Cheap check for wrappers: is profiling turned on at all?"""
+    return _state['enabled']
+
+
+def _current_session_id():
+    from shiny.session import get_current_session
+
+    session = get_current_session()
+    return getattr(session, 'id', None)
+
+
+def profile_call(label, fn, *args, **kwargs):
+    """Call fn, profiling it when profiling is on and this run is sampled.
+
+    Calls made while another profile is running on the same thread (a hot
+    function inside a profiled reactive) are part of that profile.
+    """
+    if not _state['enabled'] or getattr(_local, 'active', False):
+        return fn(*args, **kwargs)
+    session_id = _current_session_id()
+    if (_state['session'] and session_id != _state['session']) or random.random() >= PROFILE_SAMPLE_RATE:
+        return fn(*args, **kwargs)
+    # Runs stay unprofiled once PROFILE_MAX_FILES files have been written
+    if _state['files'] >= PROFILE_MAX_FILES:
+        return fn(*args, **kwargs)
+
+    profiler = cProfile.Profile() if PROFILE_FORMAT in ("pstats", "both") else None
+    stacks = Counter() if PROFILE_FORMAT in ("folded", "both") else None
+    thread_id = threading.get_ident()
+    _local.active = True
+    if stacks is not None:
+        _get_sampler().add(thread_id, sys._getframe(), stacks)
+    try:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    finally:
+        _local.active = False
+        if stacks is not None:
+            _sampler.remove(thread_id)
+        _write(session_id, label, profiler, stacks)
+
+
+def profiled(fn):
+    """Decorate a hot function so it is profiled, under its own name, when profiling is on."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _state['enabled']:
+            return fn(*args, **kwargs)
+        return profile_call(fn.__name__, fn, *args, **kwargs)
+    return wrapper
+
+
+def _safe(text):
+    return re.sub(r"[^\w.-]", "_", str(text))
+
+
+def _write(session_id, label, profiler, stacks):
+    """Write one profile under PROFILE_DIR/<session>/."""
+    directory = os.path.join(PROFILE_DIR, _safe(session_id or "no-session"))
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{next(_sequence):05d}-{_safe(label)}")
+    files = 0
+    if profiler is not None:
+        profiler.dump_stats(base + ".pstats")
+        files += 1
+    if stacks:
+        with open(base + ".folded", "w") as f:
+            f.writelines(f"{label};{stack} {count}\n" for stack, count in stacks.items())
+        files += 1
+    with _lock:
+        _state['written'] += 1
+        _state['files'] += files
+
+
+class _StackSampler(threading.Thread):
+    """Daemon thread recording the stacks of profiled threads every PROFILE_INTERVAL seconds."""
+
+    def __init__(self):
+        super().__init__(name="aegis-profile-sampler", daemon=True)
+        self.targets = {}
+        self.wake = threading.Event()
+
+    def add(self, thread_id, root, stacks):
+        with _lock:
+            self.targets[thread_id] = (root, stacks)
+        self.wake.set()
+
+    def remove(self, thread_id):
+        with _lock:
+            self.targets.pop(thread_id, None)
+
+    def run(self):
+        while True:
+            if not self.targets:
+                self.wake.wait()
+                self.wake.clear()
+            time.sleep(PROFILE_INTERVAL)
+            frames = sys._current_frames()
+            with _lock:
+                for thread_id, (root, stacks) in self.targets.items():
+                    stack = _stack_below(frames.get(thread_id), root)
+                    if stack:
+                        stacks[stack] += 1
+
+
+def _stack_below(frame, root):
+    """Return the frames called from root down to frame as a collapsed stack, or None."""
+    names = []
+    while frame is not None and frame is not root:
+        code = frame.f_code
+        # Leave out the wrappers of nested profiled functions
+        if code.co_filename != __file__:
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    if frame is None:
+        return None
+    return ";".join(reversed(names))
+
+
+def _get_sampler():
+    global _sampler
+    with _lock:
+        if _sampler is None:
+            _sampler = _StackSampler()
+            _sampler.start()
+    return _sampler
@@ -0,0 +1,58 @@
+"""
+AEGIS Ranking
+Top-K and bottom-K selection by partial partitioning instead of full sorts
+"""
+
+import numpy as np
+from config import NUMERIC_FIELDS
+
+
+def top_k(values, k, largest=True):
+    """Return the positions of the k largest (or smallest) values, best first.
+
+    Uses np.argpartition, so only the k selected values are sorted. Ties are
+    broken by position and NaN comes last, so the result is exactly the first
+    k positions of a stable full sort.
+    """
+    keys = np.asarray(values, dtype=float)
+    keys = -keys if largest else keys
+    n = len(keys)
+    k = min(max(int(k), 0), n)
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    if k == n:
+        return np.argsort(keys, kind='stable')
+
+    threshold = keys[np.argpartition(keys, k - 1)[:k]].max()
+    if np.isnan(threshold):
+        # Fewer than k non-NaN values: every value is taken, NaN by position
+        return np.argsort(keys, kind='stable')[:k]
+
+    # Everything better than the k-th value, then its ties in position order
+    better = np.flatnonzero(keys < threshold)
+    ties = np.flatnonzero(keys == threshold)[:k - len(better)]
+    chosen = np.concatenate((better, ties))
+    return chosen[np.argsort(keys[chosen], kind='stable')]
+
+
+def rank_rows(df, field, k, largest=True):
+    """Return the positions of the top-k (or bottom-k) rows of df by a numeric field."""
+    if field not in NUMERIC_FIELDS:
+        raise ValueError(f"Cannot rank by '{field}'. Choose from: {', '.join(NUMERIC_FIELDS)}")
+    return top_k(df[field].to_numpy(dtype=float), k, largest)
+
+
+def top_n_groups(codes, values, n_groups, n):
+    """Sum values per group and keep the n groups with the largest totals.
+
+    codes holds a group number per row (negative for rows to skip). Returns
+    (the top groups, best first; the slot of every group, with len(top) for
+    groups folded into "Other"; and how many groups were folded).
+    """
+    valid = (codes >= 0) & ~np.isnan(values)
+    totals = np.bincount(codes[valid], weights=values[valid], minlength=n_groups)
+    present = np.flatnonzero(np.bincount(codes[valid], minlength=n_groups) > 0)
+    top = present[top_k(totals[present], n)]
+    slots = np.full(n_groups, len(top), dtype=np.int64)
+    slots[top] = np.arange(len(top))
+    return top, slots, len(present) - len(top)
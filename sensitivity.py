@@ -0,0 +1,100 @@
+"""
+AEGIS Sensitivity Analysis
+Portfolio metrics under perturbed inputs, evaluated as broadcast NumPy grids
+"""
+
+import numpy as np
+from config import SENSITIVITY_PERTURBATIONS, SENSITIVITY_GRID_STEPS, SENSITIVITY_BLOCK_ELEMENTS
+
+
+# Inputs of calculate_metrics that can be perturbed, and the portfolio metrics reported
+SENSITIVITY_INPUTS = ["cost_m", "roi", "maintenance_pct", "lifespan_years"]
+SENSITIVITY_METRICS = ["net_value", "lifetime_return", "total_ownership_cost", "value_score"]
+
+
+def perturb(values, kind, offsets):
+    """Return a (grid points, items) array of values shifted by each offset, floored at zero."""
+    if kind == "relative":
+        perturbed = values[None, :] * (1.0 + offsets[:, None])
+    elif kind == "absolute":
+        perturbed = values[None, :] + offsets[:, None]
+    else:
+        raise ValueError(f"Unknown perturbation kind '{kind}'. Use 'relative' or 'absolute'")
+    return np.maximum(perturbed, 0.0, out=perturbed)
+
+
+def metric_sums(cost_m, roi, maintenance_pct, lifespan_years):
+    """Sum the calculate_metrics outputs over the last (item) axis of broadcastable inputs.
+
+    value_score is summed too; run_sensitivity turns it into the mean.
+    """
+    ownership = cost_m * (1.0 + maintenance_pct * lifespan_years)
+    lifetime_return = cost_m * roi
+    net_value = lifetime_return - ownership
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value_score = net_value / cost_m
+    return {
+        'net_value': net_value.sum(axis=-1),
+        'lifetime_return': lifetime_return.sum(axis=-1),
+        'total_ownership_cost': ownership.sum(axis=-1),
+        'value_score': value_score.sum(axis=-1),
+    }
+
+
+def run_sensitivity(df, perturbations=None, steps=SENSITIVITY_GRID_STEPS):
+    """Evaluate portfolio metrics with each input perturbed across a grid, one input at a time.
+
+    perturbations maps input columns to (kind, amount); the grid runs from
+    -amount to +amount in `steps` points. Each input is evaluated as one
+    (grid points, items) broadcast per block of items, so no perturbed frame
+    is ever built.
+
+    Returns a dict with 'baseline' ({metric: value}), 'items' (rows used), and
+    'parameters': {input: {'kind', 'offsets', 'values': {metric: array}}}.
+    Portfolio metrics are totals, except value_score, which is the mean.
+    """
+    perturbations = SENSITIVITY_PERTURBATIONS if perturbations is None else perturbations
+    inputs = df[SENSITIVITY_INPUTS].to_numpy(dtype=float)
+    inputs = inputs[~np.isnan(inputs).any(axis=1)]
+    columns = dict(zip(SENSITIVITY_INPUTS, inputs.T))
+    n_items = len(inputs)
+
+    def portfolio_metrics(sums):
+        sums['value_score'] = sums['value_score'] / n_items if n_items else np.full_like(sums['value_score'], np.nan)
+        return sums
+
+    baseline = {metric: float(value) for metric, value in portfolio_metrics(metric_sums(**columns)).items()}
+
+    parameters = {}
+    for name, (kind, amount) in perturbations.items():
+        offsets = np.linspace(-amount, amount, steps)
+        sums = {metric: np.zeros(steps) for metric in SENSITIVITY_METRICS}
+        block = max(1, SENSITIVITY_BLOCK_ELEMENTS // steps)
+        for start in range(0, n_items, block):
+            chunk = {field: values[start:start + block] for field, values in columns.items()}
+            chunk[name] = perturb(chunk[name], kind, offsets)
+            for metric, value in metric_sums(**chunk).items():
+                sums[metric] += value
+        parameters[name] = {'kind': kind, 'offsets': offsets, 'values': portfolio_metrics(sums)}
+
+    return {'baseline': baseline, 'items': n_items, 'parameters': parameters}
+
+
+def tornado(result, metric="net_value"):
+    """Return tornado bars for a metric: the change at the low and high end of each input's grid.
+
+    Bars are sorted by swing (high minus low), widest first.
+    """
+    base = result['baseline'][metric]
+    bars = []
+    for name, entry in result['parameters'].items():
+        values = entry['values'][metric]
+        bars.append({
+            'parameter': name,
+            'kind': entry['kind'],
+            'low_offset': float(entry['offsets'][0]),
+            'high_offset': float(entry['offsets'][-1]),
+            'low': float(values[0] - base),
+            'high': float(values[-1] - base),
+        })
+    return sorted(bars, key=lambda bar: abs(bar['high'] - bar['low']), reverse=True)
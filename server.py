@@ -4,31 +4,48 @@ Reactive handlers and output rendering
 """
 
 from shiny import ui, render, reactive
-from shinywidgets import render_plotly
-import pandas as pd
 import json
-from data import BASE_DATA
-from utils import filter_data, create_chart, format_currency, parse_simple_text, validate_chart_config
-from config import FIELD_DISPLAY_NAMES, NUMERIC_FIELDS, CATEGORICAL_FIELDS, COLORS
+import time
+from config import (
+    FIELD_DISPLAY_NAMES, NUMERIC_FIELDS, CATEGORICAL_FIELDS, COLORS,
+    FILTER_DEBOUNCE_MS, FILTER_MAX_WAIT_MS, FILTER_PRESETS
+)
 
 
 def server(input, output, session):
+    # Imported with the first session so pandas, the dataset, and the widget
+    # toolkit stay out of app startup; later sessions reuse the loaded modules
+    from shinywidgets import render_plotly
+    from data import get_base_data, summarize_portfolio
+    from optimizer import optimize_portfolio, OBJECTIVES, OPTIMIZER_METHODS
+    from simulation import SIMULATED_FIELDS
+    from sensitivity import SENSITIVITY_METRICS
+    from cashflow import CASH_FLOW_FIELDS
+    from export import EXPORT_FORMATS, export_filename, iter_export, resolve_format
+    from metrics import instrument, track_session
+    from utils import (
+        filter_base_data, filter_key, create_chart_cached, format_currency, format_table, query_table, parse_simple_text,
+        validate_chart_config, simulate_selection, format_band_value
+    )
+    
+    track_session(session)
     
     # Reactive values
-    filtered_data = reactive.Value(BASE_DATA.copy())
+    filtered_data = reactive.Value(get_base_data())
     
     chart_config = reactive.Value({
         'type': 'Bar Chart', 'x': 'department', 'y': 'cost_m',
-        'color': 'category', 'trendline': False
+        'color': 'category', 'trendline': False, 'frontier': False, 'top_n': 0
     })
     
     advanced_chart_config = reactive.Value({
         'type': 'Bar Chart', 'x': 'department', 'y': 'cost_m',
-        'color': 'category', 'trendline': False
+        'color': 'category', 'trendline': False, 'frontier': False, 'top_n': 0
     })
     
     # Dynamic field options based on chart type
     @reactive.Effect
+    @instrument("effect", "chart_field_options")
     def _():
         chart_type = input.chart_type()
         
@@ -44,6 +61,15 @@ def server(input, output, session):
         elif chart_type == "Histogram":
             x_options = {field: FIELD_DISPLAY_NAMES[field] for field in NUMERIC_FIELDS}
             y_options = {field: FIELD_DISPLAY_NAMES[field] for field in NUMERIC_FIELDS}
+        elif chart_type == "Risk Bands":
+            x_options = {"upgrade_name": FIELD_DISPLAY_NAMES["upgrade_name"]}
+            y_options = {field: FIELD_DISPLAY_NAMES[field] for field in SIMULATED_FIELDS}
+        elif chart_type == "Tornado":
+            x_options = {"None": "All Inputs"}
+            y_options = {field: FIELD_DISPLAY_NAMES[field] for field in SENSITIVITY_METRICS}
+        elif chart_type == "Cash Flow":
+            x_options = {"None": "Year"}
+            y_options = {field: FIELD_DISPLAY_NAMES[field] for field in CASH_FLOW_FIELDS}
         else:
             x_options = {field: FIELD_DISPLAY_NAMES[field] for field in CATEGORICAL_FIELDS + NUMERIC_FIELDS}
             y_options = {field: FIELD_DISPLAY_NAMES[field] for field in NUMERIC_FIELDS}
@@ -51,132 +77,336 @@ def server(input, output, session):
         ui.update_select("x_axis", choices=x_options)
         ui.update_select("y_axis", choices=y_options)
     
-    # Preset button handlers
+    # Sidebar filters. Input changes are coalesced before filtering: a burst
+    # (such as a slider drag) becomes one filter change FILTER_DEBOUNCE_MS after
+    # the last input, or every FILTER_MAX_WAIT_MS while it lasts, and always
+    # ends on the final values. filter_state holds the applied filter key.
+    filter_state = reactive.Value(None)
+    pending_filters = reactive.Value(None)
+    
+    def apply_filters(key):
+        pending_filters.set(None)
+        with reactive.isolate():
+            if key != filter_state.get():
+                filter_state.set(key)
+    
+    @reactive.Effect
+    @instrument("effect", "filter_inputs")
+    def _():
+        key = filter_key(
+            input.filter_department(), input.filter_category(), input.filter_priority(),
+            input.max_budget(), input.min_roi()
+        )
+        with reactive.isolate():
+            first = filter_state.get() is None
+            pending = pending_filters.get()
+        if first or FILTER_DEBOUNCE_MS <= 0:
+            apply_filters(key)
+            return
+        now = time.monotonic()
+        started = pending[2] if pending else now
+        due = min(now + FILTER_DEBOUNCE_MS / 1000, started + FILTER_MAX_WAIT_MS / 1000)
+        pending_filters.set((key, due, started))
+    
+    @reactive.Effect
+    @instrument("effect", "filter_commit")
+    def _():
+        pending = pending_filters.get()
+        if pending is None:
+            return
+        remaining = pending[1] - time.monotonic()
+        if remaining > 0:
+            reactive.invalidate_later(remaining)
+            return
+        apply_filters(pending[0])
+    
+    # Preset buttons apply all their filters as one change, then move the
+    # sidebar controls to match; the echoed inputs then equal the applied filter
+    def apply_preset(name):
+        preset = FILTER_PRESETS[name]
+        apply_filters(filter_key(*preset))
+        departments, categories, priorities, max_budget, min_roi = preset
+        ui.update_checkbox_group("filter_department", selected=departments)
+        ui.update_checkbox_group("filter_category", selected=categories)
+        ui.update_checkbox_group("filter_priority", selected=priorities)
+        ui.update_slider("max_budget", value=max_budget)
+        ui.update_slider("min_roi", value=min_roi)
+    
     @reactive.Effect
     @reactive.event(input.preset_full)
+    @instrument("effect", "preset_full")
     def _():
-        ui.update_checkbox_group("filter_department", selected=["Army", "Navy", "Air Force", "Marines"])
-        ui.update_checkbox_group("filter_category", selected=["Vehicles", "Aircraft", "Communications", "Weapons"])
-        ui.update_checkbox_group("filter_priority", selected=["Critical", "High", "Medium"])
-        ui.update_slider("max_budget", value=400)
-        ui.update_slider("min_roi", value=1.0)
+        apply_preset("preset_full")
     
     @reactive.Effect
     @reactive.event(input.preset_budget)
+    @instrument("effect", "preset_budget")
     def _():
-        ui.update_checkbox_group("filter_department", selected=["Army", "Navy", "Air Force", "Marines"])
-        ui.update_checkbox_group("filter_category", selected=["Vehicles", "Aircraft", "Communications", "Weapons"])
-        ui.update_checkbox_group("filter_priority", selected=["Critical", "High"])
-        ui.update_slider("max_budget", value=200)
-        ui.update_slider("min_roi", value=1.3)
+        apply_preset("preset_budget")
     
     @reactive.Effect
     @reactive.event(input.preset_value)
+    @instrument("effect", "preset_value")
     def _():
-        ui.update_checkbox_group("filter_department", selected=["Army", "Navy", "Air Force", "Marines"])
-        ui.update_checkbox_group("filter_category", selected=["Vehicles", "Aircraft", "Communications", "Weapons"])
-        ui.update_checkbox_group("filter_priority", selected=["Critical", "High", "Medium"])
-        ui.update_slider("max_budget", value=300)
-        ui.update_slider("min_roi", value=1.4)
+        apply_preset("preset_value")
     
     # Filter data reactively
     @reactive.Effect
+    @instrument("effect", "filter_data")
     def _():
-        df = filter_data(
-            BASE_DATA,
-            list(input.filter_department()),
-            list(input.filter_category()),
-            list(input.filter_priority()),
-            input.max_budget(),
-            input.min_roi()
-        )
-        filtered_data.set(df)
+        key = filter_state.get()
+        if key is None:
+            return
+        departments, categories, priorities, max_budget, min_roi = key
+        filtered_data.set(filter_base_data(list(departments), list(categories), list(priorities), max_budget, min_roi))
     
     # Chart configuration
     @reactive.Effect
     @reactive.event(input.apply_chart)
+    @instrument("effect", "apply_chart")
     def _():
         chart_config.set({
             'type': input.chart_type(),
             'x': input.x_axis(),
             'y': input.y_axis(),
             'color': input.color_by(),
-            'trendline': input.show_trendline()
+            'trendline': input.show_trendline(),
+            'frontier': input.show_frontier(),
+            'top_n': int(input.bar_top_n() or 0)
         })
     
+    # Portfolio aggregates shared by every summary card
+    @reactive.Calc
+    @instrument("calc")
+    def portfolio_summary():
+        return summarize_portfolio(filtered_data.get())
+    
+    def metric_range(summary, field, fmt):
+        low, high = summary['min'].get(field), summary['max'].get(field)
+        if low is None:
+            return ui.div("", class_="metric-range")
+        return ui.div(f"Min {fmt(low)} · Max {fmt(high)}", class_="metric-range")
+    
     # Summary cards
     @output
     @render.ui
+    @instrument("output")
     def card_count():
-        df = filtered_data.get()
+        summary = portfolio_summary()
         return ui.div(
             ui.div("Items Count", class_="metric-label"),
-            ui.div(str(len(df)), class_="metric-value"),
+            ui.div(str(summary['count']), class_="metric-value"),
         )
     
     @output
     @render.ui
+    @instrument("output")
     def card_cost():
-        df = filtered_data.get()
-        total = df['cost_m'].sum() if not df.empty else 0
+        summary = portfolio_summary()
         return ui.div(
             ui.div("Total Cost", class_="metric-label"),
-            ui.div(format_currency(total), class_="metric-value"),
+            ui.div(format_currency(summary['sum'].get('cost_m', 0)), class_="metric-value"),
+            metric_range(summary, 'cost_m', format_currency),
         )
     
     @output
     @render.ui
+    @instrument("output")
     def card_roi():
-        df = filtered_data.get()
-        avg = df['roi'].mean() if not df.empty else 0
+        summary = portfolio_summary()
         return ui.div(
             ui.div("Average ROI", class_="metric-label"),
-            ui.div(f"{avg:.2f}x", class_="metric-value"),
+            ui.div(f"{summary['mean'].get('roi', 0):.2f}x", class_="metric-value"),
+            metric_range(summary, 'roi', lambda x: f"{x:.2f}x"),
         )
     
     @output
     @render.ui
+    @instrument("output")
     def card_value():
-        df = filtered_data.get()
-        avg = df['value_score'].mean() if not df.empty else 0
+        summary = portfolio_summary()
         return ui.div(
             ui.div("Avg Value Score", class_="metric-label"),
-            ui.div(f"{avg:.3f}", class_="metric-value"),
+            ui.div(f"{summary['mean'].get('value_score', 0):.3f}", class_="metric-value"),
+            metric_range(summary, 'value_score', lambda x: f"{x:.3f}"),
+        )
+    
+    @output
+    @render.ui
+    @instrument("output")
+    def card_ownership():
+        summary = portfolio_summary()
+        return ui.div(
+            ui.div("Total Ownership Cost", class_="metric-label"),
+            ui.div(format_currency(summary['sum'].get('total_ownership_cost', 0)), class_="metric-value"),
+            metric_range(summary, 'total_ownership_cost', format_currency),
+        )
+    
+    @output
+    @render.ui
+    @instrument("output")
+    def card_net_value():
+        summary = portfolio_summary()
+        return ui.div(
+            ui.div("Total Net Value", class_="metric-label"),
+            ui.div(format_currency(summary['sum'].get('net_value', 0)), class_="metric-value"),
+            metric_range(summary, 'net_value', format_currency),
         )
     
     # Main chart
     @render_plotly
+    @instrument("output")
     def main_chart():
         df = filtered_data.get()
         config = chart_config.get()
-        return create_chart(df, config['type'], config['x'], config['y'], config['color'], config['trendline'])
+        return create_chart_cached(df, config['type'], config['x'], config['y'], config['color'], config['trendline'], config['frontier'], config['top_n'])
     
-    # Data table
-    @render.data_frame
-    def data_table():
-        df = filtered_data.get()
+    # Budget optimizer
+    @reactive.Calc
+    @instrument("calc")
+    def optimization():
+        return optimize_portfolio(filtered_data.get(), input.optimizer_budget(), input.optimizer_objective())
+    
+    @output
+    @render.ui
+    @instrument("output")
+    def optimizer_summary():
+        result = optimization()
+        objective_name = OBJECTIVES[result['objective']][0]
+        total = f"{result['total_value']:.3f}" if result['objective'] == 'value_score' else format_currency(result['total_value'])
+        if result['optimal']:
+            quality = "Optimal"
+        else:
+            gap = (result['upper_bound'] - result['total_value']) / result['upper_bound'] if result['upper_bound'] else 0.0
+            quality = f"Within {gap:.2%} of optimal"
         
-        if df.empty:
-            return pd.DataFrame({"Message": ["No items match current filters"]})
+        def stat(label, value, detail):
+            return ui.div(
+                ui.div(label, class_="metric-label"),
+                ui.div(value, class_="metric-value"),
+                ui.div(detail, class_="metric-range"),
+            )
         
-        display_df = df[[
-            'upgrade_id', 'upgrade_name', 'department', 'category',
-            'cost_m', 'roi', 'maintenance_pct', 'age_years',
-            'lifespan_years', 'value_score'
-        ]].copy()
+        return ui.div(
+            stat("Selected Items", f"{len(result['rows']):,}", f"of {result['candidates']:,} candidates"),
+            stat("Budget Used", format_currency(result['total_cost']), f"of {format_currency(result['budget'])}"),
+            stat(f"Total {objective_name}", total, quality),
+            stat("Solve Time", f"{result['solve_ms']:.1f} ms", OPTIMIZER_METHODS[result['method']]),
+            class_="optimizer-stats"
+        )
+    
+    @render.data_frame
+    @instrument("output")
+    def optimizer_table():
+        return format_table(optimization()['selection'])
+    
+    # Risk simulation of the current selection
+    @reactive.Calc
+    @instrument("calc")
+    def risk_simulation():
+        return simulate_selection(filtered_data.get())
+    
+    @output
+    @render.ui
+    @instrument("output")
+    def risk_summary():
+        if not input.show_risk_bands():
+            return ui.div()
+        result = risk_simulation()
         
-        display_df.columns = ['ID', 'Name', 'Dept', 'Category', 'Cost', 'ROI', 'Maint', 'Age', 'Lifespan', 'Value']
-        display_df['Cost'] = display_df['Cost'].apply(lambda x: f"${x:.0f}M")
-        display_df['ROI'] = display_df['ROI'].apply(lambda x: f"{x:.2f}x")
-        display_df['Maint'] = display_df['Maint'].apply(lambda x: f"{x*100:.0f}%")
-        display_df['Value'] = display_df['Value'].apply(lambda x: f"{x:.3f}")
-        display_df = display_df.sort_values('Value', ascending=False)
+        def band(field, label):
+            p5, p50, p95 = result['portfolio'][field]
+            return ui.tags.span(
+                f"{label}: P5 {format_band_value(field, p5)} · P50 {format_band_value(field, p50)} · "
+                f"P95 {format_band_value(field, p95)}",
+                style="margin-right: 2rem;"
+            )
         
-        return display_df
+        return ui.div(
+            ui.tags.strong("Portfolio risk ", style=f"color: {COLORS['accent_blue']};"),
+            ui.tags.span(
+                f"({result['scenarios']:,} scenarios"
+                + (f", {result['simulated']:,} costliest of {result['valid_items']:,} items simulated"
+                   if result['simulated'] < result['valid_items'] else "")
+                + ")  ",
+                style=f"color: {COLORS['text_secondary']};"
+            ),
+            band('net_value', "Net Value"),
+            band('value_score', "Mean Value Score"),
+            style=f"color: {COLORS['text']}; margin-bottom: 1rem; font-size: 0.9rem;"
+        )
+    
+    # Data table: sorted, searched, and paged on the server, one formatted page at a time
+    table_page = reactive.Value(0)
+    
+    @reactive.Effect
+    @reactive.event(filtered_data, input.table_sort, input.table_order, input.table_search_field,
+                    input.table_search, input.table_page_size)
+    @instrument("effect", "table_page_reset")
+    def _():
+        table_page.set(0)
+    
+    @reactive.Effect
+    @reactive.event(input.table_prev)
+    @instrument("effect", "table_prev")
+    def _():
+        table_page.set(max(table_page.get() - 1, 0))
+    
+    @reactive.Effect
+    @reactive.event(input.table_next)
+    @instrument("effect", "table_next")
+    def _():
+        table_page.set(min(table_page.get() + 1, table_query()['pages'] - 1))
+    
+    @reactive.Calc
+    @instrument("calc")
+    def table_query():
+        bands = risk_simulation()['items'] if input.show_risk_bands() else None
+        return query_table(
+            filtered_data.get(),
+            sort_by=input.table_sort(),
+            descending=input.table_order() == "desc",
+            search_field=input.table_search_field(),
+            search_text=input.table_search(),
+            page=table_page.get(),
+            page_size=int(input.table_page_size()),
+            bands=bands
+        )
+    
+    @output
+    @render.ui
+    @instrument("output")
+    def table_status():
+        result = table_query()
+        if result['error']:
+            return ui.div(result['error'], style=f"color: {COLORS['accent_red']}; margin-bottom: 0.5rem;")
+        if result['rows'] == 0:
+            return ui.div()
+        return ui.div(
+            f"Rows {result['start'] + 1:,}–{result['stop']:,} of {result['rows']:,} · "
+            f"Page {result['page'] + 1:,} of {result['pages']:,}",
+            style=f"color: {COLORS['text_secondary']}; margin-bottom: 0.5rem; font-size: 0.9rem;"
+        )
+    
+    @render.data_frame
+    @instrument("output")
+    def data_table():
+        return render.DataGrid(table_query()['table'], summary=False)
+    
+    # Export of the current selection with raw values and every derived metric,
+    # streamed chunk by chunk (CSV when pyarrow is missing)
+    @render.download_button(
+        filename=lambda: export_filename(resolve_format(input.export_format())),
+        media_type=lambda: EXPORT_FORMATS[resolve_format(input.export_format())][2]
+    )
+    @instrument("output")
+    def export_data():
+        yield from iter_export(filtered_data.get(), input.export_format())
     
     # Custom chart configuration
     @reactive.Effect
     @reactive.event(input.generate_chart)
+    @instrument("effect", "generate_chart")
     def _():
         query_text = input.query_input()
         if not query_text or not query_text.strip():
@@ -193,7 +423,9 @@ def server(input, output, session):
                 'x': config.get('x_axis', 'department'),
                 'y': config.get('y_axis', 'cost_m'),
                 'color': config.get('color_by', 'None'),
-                'trendline': config.get('show_trendline', False)
+                'trendline': config.get('show_trendline', False),
+                'frontier': config.get('show_frontier', False),
+                'top_n': config.get('top_n', 0)
             })
         except json.JSONDecodeError:
             config = parse_simple_text(query_text)
@@ -202,11 +434,14 @@ def server(input, output, session):
                 'x': config['x_axis'],
                 'y': config['y_axis'],
                 'color': config['color_by'],
-                'trendline': config['show_trendline']
+                'trendline': config['show_trendline'],
+                'frontier': config['show_frontier'],
+                'top_n': config['top_n']
             })
     
     @output
     @render.ui
+    @instrument("output")
     def query_status():
         query_text = input.query_input()
         if not query_text or not query_text.strip():
@@ -238,8 +473,9 @@ def server(input, output, session):
     
     # Advanced chart
     @render_plotly
+    @instrument("output")
     def advanced_chart():
         df = filtered_data.get()
         config = advanced_chart_config.get()
-        return create_chart(df, config['type'], config['x'], config['y'], config['color'], config['trendline'])
+        return create_chart_cached(df, config['type'], config['x'], config['y'], config['color'], config['trendline'], config['frontier'], config['top_n'])
 
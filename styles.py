@@ -103,6 +103,24 @@ def get_custom_css():
             text-transform: uppercase;
             letter-spacing: 1.2px;
         }}
+        .metric-range {{
+            font-size: 0.75rem;
+            color: {COLORS['text_secondary']};
+        }}
+        .metric-row {{
+            margin-top: 1.5rem;
+        }}
+        .optimizer-stats {{
+            display: grid;
+            grid-template-columns: repeat(4, 1fr);
+            gap: 1rem;
+            margin-bottom: 1rem;
+            text-align: center;
+        }}
+        .optimizer-stats .metric-value {{
+            font-size: 1.6rem;
+            margin: 0.5rem 0;
+        }}
         .btn-primary {{
             background: linear-gradient(135deg, {COLORS['accent_blue']}, {COLORS['accent_purple']});
             border: none;
@@ -0,0 +1,108 @@
+"""
+AEGIS Data Table
+Server-side sorting, column search, and paging, formatting only the rows shown
+"""
+
+import operator
+import re
+import numpy as np
+import pandas as pd
+
+
+# Table columns: field -> (header, printf-style format and scale for numeric fields)
+TABLE_COLUMNS = {
+    "upgrade_id": ("ID", None),
+    "upgrade_name": ("Name", None),
+    "department": ("Dept", None),
+    "category": ("Category", None),
+    "cost_m": ("Cost", ("$%.0fM", 1)),
+    "roi": ("ROI", ("%.2fx", 1)),
+    "maintenance_pct": ("Maint", ("%.0f%%", 100)),
+    "age_years": ("Age", ("%.0f", 1)),
+    "lifespan_years": ("Lifespan", ("%.0f", 1)),
+    "value_score": ("Value", ("%.3f", 1)),
+    "npv": ("NPV", ("$%.1fM", 1)),
+}
+
+# Simulated band columns appended when risk bands are shown
+BAND_TABLE_COLUMNS = {f"net_value_p{p}": (f"Net P{p}", ("$%.1fM", 1)) for p in (5, 50, 95)}
+
+_COMPARISONS = {">=": operator.ge, "<=": operator.le, ">": operator.gt, "<": operator.lt, "=": operator.eq}
+_NUMERIC_QUERY = re.compile(r"^\s*(>=|<=|>|<|=)?\s*(-?\d+(?:\.\d*)?|-?\.\d+)\s*$")
+
+
+def is_numeric_column(df, field):
+    """Return True when a column is sorted and searched by value rather than text."""
+    return pd.api.types.is_numeric_dtype(df[field].dtype)
+
+
+def sort_order(df, field, descending=False):
+    """Return the row positions of df sorted by a column.
+
+    Numeric columns sort by value and text columns alphabetically; the sort is
+    stable in both directions and missing values always come last.
+    """
+    if is_numeric_column(df, field):
+        keys = df[field].to_numpy(dtype=float)
+    else:
+        codes, _ = pd.factorize(df[field], sort=True)
+        keys = np.where(codes < 0, np.nan, codes.astype(float))
+    return np.argsort(-keys if descending else keys, kind='stable')
+
+
+def search_mask(df, field, query):
+    """Return a boolean mask of the rows whose column matches a search query.
+
+    Text columns match a case-insensitive substring. Numeric columns take a
+    comparison such as ">50", "<=1.5", or "=20", compared in the displayed
+    unit (so Maint is in percent); a bare number means "=". Returns None for a
+    numeric query that cannot be parsed.
+    """
+    column = df[field]
+    if is_numeric_column(df, field):
+        match = _NUMERIC_QUERY.match(query)
+        if match is None:
+            return None
+        compare = _COMPARISONS[match.group(1) or "="]
+        scale = TABLE_COLUMNS.get(field, (None, (None, 1)))[1][1]
+        # Rounded so a displayed 7% matches "=7" despite float error in 0.07 * 100
+        values = np.round(column.to_numpy(dtype=float) * scale, 9)
+        with np.errstate(invalid='ignore'):
+            return compare(values, float(match.group(2)))
+
+    query = query.strip().lower()
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Match the few categories once instead of every row
+        hits = np.array([query in str(value).lower() for value in column.cat.categories], dtype=bool)
+        codes = column.cat.codes.to_numpy()
+        return np.append(hits, False)[codes]
+    return column.astype(str).str.lower().str.contains(query, regex=False).to_numpy(dtype=bool)
+
+
+def page_bounds(total_rows, page, page_size):
+    """Clamp a zero-based page number; returns (page, pages, start, stop)."""
+    pages = max(1, -(-total_rows // page_size))
+    page = min(max(int(page), 0), pages - 1)
+    start = page * page_size
+    return page, pages, start, min(start + page_size, total_rows)
+
+
+def format_rows(df, bands=None):
+    """Format rows for display with vectorized string formatting.
+
+    df is only the rows shown; bands, if given, holds the matching rows of the
+    simulated band columns.
+    """
+    columns = {}
+    for source, spec in ((df, TABLE_COLUMNS), (bands, BAND_TABLE_COLUMNS)):
+        if source is None:
+            continue
+        for field, (header, number_format) in spec.items():
+            if number_format is None:
+                columns[header] = source[field].astype(str).to_numpy()
+                continue
+            template, scale = number_format
+            values = source[field].to_numpy(dtype=float) * scale
+            text = np.char.mod(template, np.nan_to_num(values))
+            columns[header] = np.where(np.isnan(values), "", text)
+    return pd.DataFrame(columns, index=df.index)
@@ -0,0 +1,25 @@
+"""Regression checks for the chunked synthetic portfolio generator."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import SYNTHETIC_BLOCK_ROWS, generate_synthetic_portfolio  # noqa: E402
+
+
+def test_synthetic_portfolio_ignores_chunk_size():
+    # Spans three seeded blocks so chunks straddle block boundaries
+    n_rows = 2 * SYNTHETIC_BLOCK_ROWS + 1234
+    expected = generate_synthetic_portfolio(n_rows, seed=7, chunk_rows=n_rows)
+    for chunk_rows in (1000, 4093, SYNTHETIC_BLOCK_ROWS, SYNTHETIC_BLOCK_ROWS + 1):
+        result = generate_synthetic_portfolio(n_rows, seed=7, chunk_rows=chunk_rows)
+        # equals also requires matching dtypes and index, and is far faster than
+        # assert_frame_equal on categorical columns
+        assert result.equals(expected), f"chunk_rows={chunk_rows} changed the data"
+
+
+def test_synthetic_portfolio_depends_on_seed():
+    first = generate_synthetic_portfolio(500, seed=1)
+    assert first['upgrade_id'].is_unique
+    assert not first['cost_m'].equals(generate_synthetic_portfolio(500, seed=2)['cost_m'])
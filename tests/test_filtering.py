@@ -0,0 +1,60 @@
+"""Checks that the indexed filter_data matches a plain pandas mask."""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import generate_synthetic_portfolio  # noqa: E402
+from utils import filter_data  # noqa: E402
+
+
+def mask_filter(df, departments, categories, priorities, max_budget, min_roi, ranges=None):
+    """Filter the way filter_data did before the index: chained boolean masks."""
+    mask = (df['cost_m'] <= max_budget) & (df['roi'] >= min_roi)
+    for field, values in (('department', departments), ('category', categories), ('priority', priorities)):
+        if values:
+            mask &= df[field].isin(values)
+    for field, (low, high) in (ranges or {}).items():
+        if low is not None:
+            mask &= df[field] >= low
+        if high is not None:
+            mask &= df[field] <= high
+    return df[mask]
+
+
+def frame():
+    df = generate_synthetic_portfolio(20000, seed=3)
+    # Missing values must never satisfy a range
+    df.loc[df.index[::97], 'roi'] = np.nan
+    df.loc[df.index[::89], 'cost_m'] = np.nan
+    return df
+
+
+def test_filter_data_matches_masks():
+    df = frame()
+    departments = list(df['department'].cat.categories)
+    categories = list(df['category'].cat.categories)
+    cases = [
+        ([], [], [], np.inf, -np.inf, None),
+        (departments[:2], [], ['High'], 120.0, 1.5, None),
+        ([], categories[:1], [], 50.0, 0.0, {'age_years': (5, None)}),
+        (departments, categories, [], 400.0, 2.8, {'maintenance_pct': (None, 0.05), 'lifespan_years': (15, 20)}),
+        # Narrow spans take the sorted-position path, wide ones the mask path
+        ([], [], [], 10.0, -np.inf, {'roi': (2.0, 2.01)}),
+        (['Unknown'], [], [], 400.0, 0.0, None),
+    ]
+    for departments, categories, priorities, max_budget, min_roi, ranges in cases:
+        expected = mask_filter(df, departments, categories, priorities, max_budget, min_roi, ranges)
+        result = filter_data(df, departments, categories, priorities, max_budget, min_roi, ranges)
+        pd.testing.assert_frame_equal(result, expected)
+
+
+def test_filter_data_nan_bounds_select_nothing():
+    df = frame()
+    assert filter_data(df, [], [], [], np.nan, 0.0).empty
+    assert filter_data(df, [], [], [], 400.0, np.nan).empty
+    assert filter_data(df, [], [], [], 400.0, 0.0, {'age_years': (np.nan, None)}).empty
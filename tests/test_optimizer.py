@@ -0,0 +1,46 @@
+"""Brute-force regression checks for the exact knapsack solvers."""
+
+import itertools
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optimizer import knapsack_branch_and_bound  # noqa: E402
+
+
+def brute_force(values, costs, budget):
+    """Return the best total value over every subset that fits the budget."""
+    best = 0.0
+    for mask in itertools.product((False, True), repeat=len(values)):
+        mask = np.array(mask)
+        if costs[mask].sum() <= budget * (1 + 1e-12):
+            best = max(best, values[mask].sum())
+    return best
+
+
+def test_branch_and_bound_keeps_exact_fits():
+    values = np.array([7.14, 6.02, 6.36, 3.74, 7.11, 7.57, 0.01, 7.88, 3.0])
+    costs = np.array([2.4, 2.5, 4.0, 1.2, 1.3, 1.8, 6.8, 7.8, 4.9])
+    chosen, optimal = knapsack_branch_and_bound(values, costs, 17.0)
+    assert optimal
+    assert np.isclose(values[chosen].sum(), brute_force(values, costs, 17.0))
+
+
+def test_branch_and_bound_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        budget = float(rng.integers(1, 25))
+        values = np.round(rng.uniform(0.01, 8, 8), 2)
+        costs = np.round(rng.uniform(0.1, 8, 8), 1)
+        # optimize_portfolio only passes items that fit the budget on their own
+        fits = costs <= budget
+        values, costs = values[fits], costs[fits]
+        if len(values) == 0:
+            continue
+        chosen, optimal = knapsack_branch_and_bound(values, costs, budget)
+        assert optimal
+        assert costs[chosen].sum() <= budget * (1 + 1e-9)
+        assert np.isclose(values[chosen].sum(), brute_force(values, costs, budget))
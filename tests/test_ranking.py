@@ -0,0 +1,45 @@
+"""Checks that partial top-k selection matches a stable full sort."""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ranking import rank_rows, top_k  # noqa: E402
+
+
+def sorted_top_k(values, k, largest=True):
+    """Return the first k positions of a stable full sort, NaN last."""
+    keys = -values if largest else values
+    return np.argsort(keys, kind='stable')[:max(k, 0)]
+
+
+def test_top_k_matches_stable_sort_with_ties():
+    rng = np.random.default_rng(0)
+    for n in (1, 7, 50, 1000):
+        # Few distinct values, so the k-th value almost always has ties
+        values = rng.integers(0, 5, n).astype(float)
+        values[rng.random(n) < 0.1] = np.nan
+        for k in (0, 1, 3, n // 2, n - 1, n, n + 5):
+            for largest in (True, False):
+                np.testing.assert_array_equal(top_k(values, k, largest), sorted_top_k(values, k, largest))
+
+
+def test_top_k_with_fewer_values_than_k():
+    values = np.array([np.nan, 2.0, np.nan, 2.0, 1.0])
+    np.testing.assert_array_equal(top_k(values, 4), [1, 3, 4, 0])
+    np.testing.assert_array_equal(top_k(values, 4, largest=False), [4, 1, 3, 0])
+
+
+def test_rank_rows_rejects_unknown_fields():
+    df = pd.DataFrame({'roi': [1.0, 3.0, 3.0, 2.0]})
+    np.testing.assert_array_equal(rank_rows(df, 'roi', 2), [1, 2])
+    try:
+        rank_rows(df, 'upgrade_name', 2)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("rank_rows accepted a non-numeric field")
@@ -0,0 +1,186 @@
+"""
+AEGIS Trendlines
+Closed-form NumPy regression engine for scatter plot trendlines
+"""
+
+from statistics import NormalDist
+import numpy as np
+
+
+TRENDLINE_METHODS = ["ols", "ols_ci", "lowess", "rolling"]
+
+# Two-sided 95% Student t critical values for 1-30 degrees of freedom
+_T_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+def trendline_method(show_trendline):
+    """Map a chart's show_trendline setting (bool or method name) to a method, or None."""
+    if show_trendline is True:
+        return "ols"
+    if isinstance(show_trendline, str) and show_trendline.lower() in TRENDLINE_METHODS:
+        return show_trendline.lower()
+    return None
+
+
+def t_critical(dof, level=0.95):
+    """Return the two-sided critical value for a confidence level."""
+    if level == 0.95 and 1 <= dof <= len(_T_95):
+        return _T_95[int(dof) - 1]
+    return NormalDist().inv_cdf(0.5 + level / 2)
+
+
+def fit_ols_groups(x, y, codes, n_groups):
+    """Fit y = slope * x + intercept for every group in one batched pass.
+
+    Returns per-group arrays: 'n', 'slope', 'intercept', 'r2', 'x_mean',
+    'sxx' and 'sigma' (residual standard error), NaN where a group has fewer
+    than two distinct x values.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    sum_x = np.bincount(codes, x, n_groups)
+    sum_y = np.bincount(codes, y, n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = sum_x / n
+        y_mean = sum_y / n
+        # Centered sums avoid the cancellation of sum(x*x) - n*mean^2
+        dx = x - x_mean[codes]
+        dy = y - y_mean[codes]
+        sxx = np.bincount(codes, dx * dx, n_groups)
+        sxy = np.bincount(codes, dx * dy, n_groups)
+        syy = np.bincount(codes, dy * dy, n_groups)
+
+        slope = np.where(sxx > 0, sxy / sxx, np.nan)
+        intercept = y_mean - slope * x_mean
+        sse = np.maximum(syy - slope * sxy, 0.0)
+        r2 = np.where(syy > 0, 1.0 - sse / syy, 1.0)
+        sigma = np.sqrt(sse / np.maximum(n - 2, 1))
+
+    return {
+        'n': n, 'slope': slope, 'intercept': intercept, 'r2': np.where(np.isnan(slope), np.nan, r2),
+        'x_mean': x_mean, 'sxx': sxx, 'sigma': sigma,
+    }
+
+
+def ols_band(fit, group, x_grid, level=0.95):
+    """Return (lower, upper) confidence bounds of a group's fitted mean at x_grid."""
+    n, sxx = fit['n'][group], fit['sxx'][group]
+    fitted = fit['slope'][group] * x_grid + fit['intercept'][group]
+    se = fit['sigma'][group] * np.sqrt(1.0 / n + (x_grid - fit['x_mean'][group]) ** 2 / sxx)
+    margin = t_critical(n - 2, level) * se
+    return fitted - margin, fitted + margin
+
+
+def lowess(x, y, frac=0.3, points=80, max_points=20000):
+    """Locally weighted linear smoothing evaluated on an even grid over x.
+
+    Each grid point fits a tricube-weighted line through its frac * n nearest
+    neighbours. Inputs larger than max_points are thinned to an even stride of
+    the x-sorted data first, which keeps the cost bounded for big selections.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    order = np.argsort(x, kind='stable')
+    x, y = x[order], y[order]
+    if len(x) > max_points:
+        keep = np.linspace(0, len(x) - 1, max_points).astype(np.int64)
+        x, y = x[keep], y[keep]
+
+    grid = np.linspace(x[0], x[-1], points)
+    k = min(len(x), max(3, int(np.ceil(frac * len(x)))))
+    smoothed = np.empty(points)
+    for i, x0 in enumerate(grid):
+        distance = np.abs(x - x0)
+        nearest = np.argpartition(distance, k - 1)[:k]
+        radius = distance[nearest].max()
+        weights = (1 - (distance[nearest] / radius) ** 3) ** 3 if radius > 0 else np.ones(k)
+        xs, ys = x[nearest], y[nearest]
+        w_sum = weights.sum()
+        if w_sum == 0:
+            smoothed[i] = ys.mean()
+            continue
+        x_bar = np.dot(weights, xs) / w_sum
+        y_bar = np.dot(weights, ys) / w_sum
+        sxx = np.dot(weights, (xs - x_bar) ** 2)
+        slope = np.dot(weights, (xs - x_bar) * (ys - y_bar)) / sxx if sxx > 0 else 0.0
+        smoothed[i] = y_bar + slope * (x0 - x_bar)
+    return grid, smoothed
+
+
+def rolling_trend(x, y, window_frac=0.1, points=200):
+    """Centered rolling mean of y ordered by x, thinned to at most `points` outputs."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    order = np.argsort(x, kind='stable')
+    x, y = x[order], y[order]
+
+    window = max(1, int(len(x) * window_frac))
+    cumulative = np.concatenate(([0.0], np.cumsum(y)))
+    lo = np.clip(np.arange(len(x)) - window // 2, 0, len(x))
+    hi = np.clip(lo + window, 0, len(x))
+    means = (cumulative[hi] - cumulative[lo]) / (hi - lo)
+
+    keep = np.unique(np.linspace(0, len(x) - 1, min(points, len(x))).astype(np.int64))
+    return x[keep], means[keep]
+
+
+def compute_trendlines(x, y, codes, groups, method, level=0.95):
+    """Compute the trendline of every group for a scatter plot.
+
+    Returns one dict per group with at least two points: 'group', 'x', 'y',
+    optional 'lower' / 'upper' band arrays, and 'stats' (slope, intercept, r2)
+    for OLS fits.
+    """
+    codes = np.asarray(codes)
+    # Points without a group (code -1, a missing color value) are not fitted
+    keep = codes >= 0
+    x = np.asarray(x, dtype=float)[keep]
+    y = np.asarray(y, dtype=float)[keep]
+    codes = codes[keep]
+    lines = []
+
+    if method in ("ols", "ols_ci"):
+        fit = fit_ols_groups(x, y, codes, len(groups))
+        x_min = np.full(len(groups), np.inf)
+        x_max = np.full(len(groups), -np.inf)
+        np.minimum.at(x_min, codes, x)
+        np.maximum.at(x_max, codes, x)
+        for g, group in enumerate(groups):
+            if fit['n'][g] < 2 or np.isnan(fit['slope'][g]):
+                continue
+            line_x = np.linspace(x_min[g], x_max[g], 50 if method == "ols_ci" else 2)
+            line = {
+                'group': group,
+                'x': line_x,
+                'y': fit['slope'][g] * line_x + fit['intercept'][g],
+                'stats': {
+                    'slope': float(fit['slope'][g]),
+                    'intercept': float(fit['intercept'][g]),
+                    'r2': float(fit['r2'][g]),
+                    'n': int(fit['n'][g]),
+                },
+            }
+            if method == "ols_ci" and fit['n'][g] > 2:
+                line['lower'], line['upper'] = ols_band(fit, g, line_x, level)
+            lines.append(line)
+        return lines
+
+    # Smoothers need each group's points; one stable sort groups them all at once
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(groups) + 1))
+    for g, group in enumerate(groups):
+        members = order[bounds[g]:bounds[g + 1]]
+        if len(members) < 2:
+            continue
+        if method == "lowess":
+            line_x, line_y = lowess(x[members], y[members])
+        else:
+            line_x, line_y = rolling_trend(x[members], y[members])
+        lines.append({'group': group, 'x': line_x, 'y': line_y})
+    return lines
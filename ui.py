@@ -7,9 +7,22 @@ from shiny import ui
 from shinywidgets import output_widget
 from config import (
     COLORS, FIELD_DISPLAY_NAMES, COLOR_DISPLAY_NAMES,
-    CATEGORICAL_FIELDS, NUMERIC_FIELDS, COLOR_OPTIONS
+    CATEGORICAL_FIELDS, NUMERIC_FIELDS, COLOR_OPTIONS, OPTIMIZER_DEFAULT_BUDGET, TABLE_PAGE_SIZE
 )
 from styles import get_custom_css
+from table import TABLE_COLUMNS
+from export import EXPORT_FORMATS
+
+
+DEFAULT_QUERY = '''{
+  "chart_type": "Scatter Plot",
+  "x_axis": "cost_m",
+  "y_axis": "roi",
+  "color_by": "department",
+  "show_trendline": false
+}'''
+
+table_fields = {field: header for field, (header, _) in TABLE_COLUMNS.items()}
 
 
 app_ui = ui.page_fluid(
@@ -65,6 +78,9 @@ app_ui = ui.page_fluid(
                         ui.div("MIN ROI", class_="section-title"),
                         ui.input_slider("min_roi", None, min=1.0, max=1.8, value=1.2, step=0.1, post="x"),
                         
+                        ui.div("RISK SIMULATION", class_="section-title"),
+                        ui.input_checkbox("show_risk_bands", "Show P5 / P50 / P95 bands", value=False),
+                        
                         ui.div("PRESETS", class_="section-title"),
                         ui.input_action_button("preset_full", "Full Portfolio", class_="btn-primary"),
                         ui.input_action_button("preset_budget", "Budget Constrained", class_="btn-primary"),
@@ -85,6 +101,11 @@ app_ui = ui.page_fluid(
                         ui.column(3, ui.div(ui.output_ui("card_roi"), class_="metric-card")),
                         ui.column(3, ui.div(ui.output_ui("card_value"), class_="metric-card")),
                     ),
+                    ui.row(
+                        ui.column(6, ui.div(ui.output_ui("card_ownership"), class_="metric-card")),
+                        ui.column(6, ui.div(ui.output_ui("card_net_value"), class_="metric-card")),
+                        class_="metric-row"
+                    ),
                     
                     # Chart area
                     ui.div(
@@ -95,7 +116,10 @@ app_ui = ui.page_fluid(
                                     "Bar Chart": "Bar Chart",
                                     "Scatter Plot": "Scatter Plot",
                                     "Box Plot": "Box Plot",
-                                    "Histogram": "Histogram"
+                                    "Histogram": "Histogram",
+                                    "Risk Bands": "Risk Bands",
+                                    "Tornado": "Tornado",
+                                    "Cash Flow": "Cash Flow"
                                 }, selected="Bar Chart")),
                                 ui.column(3, ui.input_select("x_axis", "X-Axis Field", {
                                     field: FIELD_DISPLAY_NAMES[field] for field in CATEGORICAL_FIELDS + NUMERIC_FIELDS
@@ -105,9 +129,11 @@ app_ui = ui.page_fluid(
                                 }, selected="cost_m")),
                                 ui.column(2, ui.input_select("color_by", "Color By", {
                                     opt: COLOR_DISPLAY_NAMES[opt] for opt in COLOR_OPTIONS
-                                }, selected="category")),
+                                }, selected="category"),
+                                ui.input_numeric("bar_top_n", "Top N + Other (Bar, 0 = auto)", value=0, min=0, step=5)),
                                 ui.column(2, ui.div(
                                     ui.input_checkbox("show_trendline", "Show Trendline", value=False),
+                                    ui.input_checkbox("show_frontier", "Show Pareto Frontier", value=False),
                                     ui.tags.small("(Scatter plots only)", style=f"color: {COLORS['text_secondary']}; font-size: 0.7rem;"),
                                     style="padding-top: 1.75rem;"
                                 )),
@@ -119,9 +145,59 @@ app_ui = ui.page_fluid(
                         class_="card"
                     ),
                     
+                    # Budget optimizer
+                    ui.div(
+                        ui.h4("Budget Optimizer"),
+                        ui.div(
+                            ui.row(
+                                ui.column(4, ui.input_numeric("optimizer_budget", "Total Budget ($M)", value=OPTIMIZER_DEFAULT_BUDGET, min=0, step=50)),
+                                ui.column(4, ui.input_select("optimizer_objective", "Maximize", {
+                                    "net_value": "Total Net Value",
+                                    "lifetime_return": "Total Lifetime Return",
+                                    "value_score": "Total Value Score"
+                                }, selected="net_value")),
+                            ),
+                            class_="chart-controls"
+                        ),
+                        ui.output_ui("optimizer_summary"),
+                        ui.output_data_frame("optimizer_table"),
+                        class_="card"
+                    ),
+                    
                     # Data table
                     ui.div(
                         ui.h4("Equipment Portfolio Data"),
+                        ui.output_ui("risk_summary"),
+                        ui.div(
+                            ui.row(
+                                ui.column(2, ui.input_select("table_sort", "Sort By", table_fields, selected="value_score")),
+                                ui.column(2, ui.input_select("table_order", "Order", {
+                                    "desc": "Descending",
+                                    "asc": "Ascending"
+                                }, selected="desc")),
+                                ui.column(2, ui.input_select("table_search_field", "Search In", table_fields, selected="upgrade_name")),
+                                ui.column(3, ui.input_text("table_search", "Search", placeholder="Text, or >50, <=1.5, =20")),
+                                ui.column(1, ui.input_select("table_page_size", "Rows", {
+                                    "25": "25", "50": "50", "100": "100"
+                                }, selected=str(TABLE_PAGE_SIZE))),
+                                ui.column(2, ui.div(
+                                    ui.input_action_button("table_prev", "‹ Prev", class_="btn-secondary"),
+                                    ui.input_action_button("table_next", "Next ›", class_="btn-secondary"),
+                                    style="padding-top: 1.5rem; display: flex; gap: 0.5rem;"
+                                ))
+                            ),
+                            ui.row(
+                                ui.column(2, ui.input_select("export_format", "Export Format", {
+                                    fmt: label for fmt, (label, _, _, _) in EXPORT_FORMATS.items()
+                                }, selected="parquet")),
+                                ui.column(3, ui.div(
+                                    ui.download_button("export_data", "Download Selection", class_="btn-secondary"),
+                                    style="padding-top: 1.5rem;"
+                                ))
+                            ),
+                            class_="chart-controls"
+                        ),
+                        ui.output_ui("table_status"),
                         ui.output_data_frame("data_table"),
                         class_="card"
                     ),
@@ -141,22 +217,19 @@ app_ui = ui.page_fluid(
                          style=f"color: {COLORS['text']}; margin-bottom: 0.5rem; line-height: 1.6;"),
                     ui.tags.div(
                         ui.tags.strong("Quick Guide: ", style=f"color: {COLORS['accent_blue']};"),
-                        ui.tags.span("chart_type: Bar Chart, Scatter Plot, Box Plot, Histogram  |  ", style=f"color: {COLORS['text']};"),
+                        ui.tags.span("chart_type: Bar Chart, Scatter Plot, Box Plot, Histogram, Risk Bands, Tornado, Cash Flow  |  ", style=f"color: {COLORS['text']};"),
                         ui.tags.span("x_axis/y_axis: cost_m, roi, value_score, department, category  |  ", style=f"color: {COLORS['text']};"),
-                        ui.tags.span("color_by: department, category, priority", style=f"color: {COLORS['text']};"),
+                        ui.tags.span("color_by: department, category, priority  |  ", style=f"color: {COLORS['text']};"),
+                        ui.tags.span("show_trendline: true, false, ols_ci, lowess, rolling  |  ", style=f"color: {COLORS['text']};"),
+                        ui.tags.span("top_n: 0 (auto) or bars in a Bar Chart  |  ", style=f"color: {COLORS['text']};"),
+                        ui.tags.span("show_frontier: true, false, skyline", style=f"color: {COLORS['text']};"),
                         style="font-size: 0.85rem; margin-top: 0.5rem;"
                     ),
                     class_="card"
                 ),
                 
                 ui.div(
-                    ui.input_text_area("query_input", "Chart Configuration", value='''{
-  "chart_type": "Scatter Plot",
-  "x_axis": "cost_m",
-  "y_axis": "roi",
-  "color_by": "department",
-  "show_trendline": false
-}''', rows=10, width="100%"),
+                    ui.input_text_area("query_input", "Chart Configuration", value=DEFAULT_QUERY, rows=10, width="100%"),
                     ui.input_action_button("generate_chart", "Generate Chart", class_="btn-primary", style="margin-top: 1rem; width: 200px;"),
                     ui.output_ui("query_status"),
                     class_="card",
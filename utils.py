@@ -3,34 +3,130 @@ AEGIS Utility Functions
 Chart creation, filtering, and parsing logic
 """
 
-import plotly.express as px
 import plotly.graph_objects as go
+import functools
+import hashlib
+import numpy as np
+import pandas as pd
 import re
+from aggregations import (
+    density_grid, nice_bin_edges, grouped_histogram, grouped_box_stats
+)
+from cache import LRUCache, estimate_nbytes, object_memo
+from trendlines import compute_trendlines, trendline_method, TRENDLINE_METHODS
+from simulation import simulate_portfolio, SIMULATED_FIELDS
+from ranking import top_k, top_n_groups
+from table import sort_order, search_mask, page_bounds, format_rows, is_numeric_column
+from cashflow import project_cash_flows, CASH_FLOW_FIELDS
+from sensitivity import run_sensitivity, tornado, SENSITIVITY_METRICS
+from pareto import frontier_rows, frontier_mode, FRONTIER_MODES, PARETO_FIELDS, OBJECTIVE_DIRECTIONS
+from data import get_versioned_base_data
+from indexing import get_index
+from profiling import profiled
 from config import (
     COLORS, DEPARTMENT_COLORS, CATEGORY_COLORS, PRIORITY_COLORS,
-    FIELD_DISPLAY_NAMES, NUMERIC_FIELDS, CATEGORICAL_FIELDS
+    FIELD_DISPLAY_NAMES, NUMERIC_FIELDS, CATEGORICAL_FIELDS,
+    FILTER_CACHE_ENTRIES, FILTER_CACHE_MB, FIGURE_CACHE_ENTRIES, FIGURE_CACHE_MB,
+    SCATTER_WEBGL_ROWS, SCATTER_DENSITY_ROWS, SCATTER_DENSITY_BINS, SCATTER_DENSITY_TOP_ITEMS,
+    BOX_MAX_OUTLIERS, TRENDLINE_CACHE_ENTRIES, FRONTIER_CACHE_ENTRIES,
+    SIMULATION_SCENARIOS, SIMULATION_SEED, SIMULATION_MAX_DRAWS, SIMULATION_CHART_ITEMS, SIMULATION_CACHE_ENTRIES,
+    PROJECTION_DISCOUNT_RATE, TABLE_PAGE_SIZE, TABLE_CACHE_ENTRIES, BAR_TOP_N, BAR_MAX_ROWS
 )
 
 
-def filter_data(df, departments, categories, priorities, max_budget, min_roi):
-    """Apply filters to the dataset."""
-    filtered = df.copy()
+# Filtered selections of the base dataset, shared by every session. Cached
+# frames are shared objects and must not be modified in place.
+FILTER_CACHE = LRUCache("filter", max_entries=FILTER_CACHE_ENTRIES, max_bytes=FILTER_CACHE_MB * 1e6)
+
+# Serialized figure JSON keyed by dataset version, selection, and chart config
+FIGURE_CACHE = LRUCache("figure", max_entries=FIGURE_CACHE_ENTRIES, max_bytes=FIGURE_CACHE_MB * 1e6)
+
+# Fitted trendlines keyed by dataset version, selection, x, y, color, and method
+TRENDLINE_CACHE = LRUCache("trendline", max_entries=TRENDLINE_CACHE_ENTRIES)
+
+# Pareto frontier row positions keyed by dataset version, selection, and objective fields
+FRONTIER_CACHE = LRUCache("frontier", max_entries=FRONTIER_CACHE_ENTRIES)
+
+# Monte Carlo results keyed by dataset version, selection, scenario count, and seed
+SIMULATION_CACHE = LRUCache(
+    "simulation", max_entries=SIMULATION_CACHE_ENTRIES,
+    sizeof=lambda result: estimate_nbytes(result['items'])
+)
+
+# Data table sort orders and search masks keyed by dataset version, selection, and column
+TABLE_CACHE = LRUCache("table", max_entries=TABLE_CACHE_ENTRIES)
+
+
+@profiled
+def filter_data(df, departments, categories, priorities, max_budget, min_roi, ranges=None):
+    """Apply filters to the dataset.
     
-    if departments:
-        filtered = filtered[filtered['department'].isin(departments)]
-    if categories:
-        filtered = filtered[filtered['category'].isin(categories)]
-    if priorities:
-        filtered = filtered[filtered['priority'].isin(priorities)]
+    ranges optionally adds {field: (low, high)} inclusive bounds on any numeric
+    field; None leaves a side open.
+    """
+    bounds = [('cost_m', None, max_budget), ('roi', min_roi, None)]
+    for field, (low, high) in (ranges or {}).items():
+        bounds.append((field, low, high))
+    
+    rows = get_index(df).select(
+        categorical={
+            'department': departments,
+            'category': categories,
+            'priority': priorities,
+        },
+        ranges=bounds,
+    )
     
-    filtered = filtered[filtered['cost_m'] <= max_budget]
-    filtered = filtered[filtered['roi'] >= min_roi]
+    # Only the final selection is materialized
+    return df.take(rows)
+
+
+def filter_key(departments, categories, priorities, max_budget, min_roi):
+    """Normalize filter inputs into a hashable key."""
+    return (
+        tuple(sorted(set(departments))),
+        tuple(sorted(set(categories))),
+        tuple(sorted(set(priorities))),
+        float(max_budget),
+        float(min_roi),
+    )
+
+
+def filter_base_data(departments, categories, priorities, max_budget, min_roi):
+    """Filter the base dataset, reusing results cached for the same filters and dataset version."""
+    version, df = get_versioned_base_data()
+    key = (version,) + filter_key(departments, categories, priorities, max_budget, min_roi)
+    selection = FILTER_CACHE.get_or_compute(
+        key, lambda: filter_data(df, departments, categories, priorities, max_budget, min_roi)
+    )
+    # Stamp the selection with the dataset version it was taken from
+    object_memo(selection, 'dataset_version', lambda: version)
+    return selection
+
+
+def selection_fingerprint(df):
+    """Return a fingerprint of which base rows a selection holds."""
+    def compute():
+        labels = df.index.to_numpy()
+        if labels.dtype.kind in 'iu':
+            data = np.ascontiguousarray(labels).tobytes()
+        else:
+            data = pd.util.hash_pandas_object(df.index, index=False).to_numpy().tobytes()
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
     
-    return filtered
+    return object_memo(df, 'fingerprint', compute)
 
 
-def create_chart(df, chart_type, x_field, y_field, color_field, show_trendline=False):
-    """Create plotly chart based on type and configuration."""
+@profiled
+def create_chart(df, chart_type, x_field, y_field, color_field, show_trendline=False, show_frontier=False, top_n=0):
+    """Create plotly chart based on type and configuration.
+    
+    Bar charts plot every row up to BAR_MAX_ROWS rows and the top BAR_TOP_N
+    x values plus "Other" beyond that; top_n > 0 always plots the top N.
+    """
+    # Plotly Express is only needed once a chart is drawn, so keep it out of app startup
+    import plotly.express as px
+    
     if df.empty:
         fig = go.Figure()
         fig.add_annotation(
@@ -61,55 +157,93 @@ def create_chart(df, chart_type, x_field, y_field, color_field, show_trendline=F
             if y_field not in NUMERIC_FIELDS:
                 return create_error_chart("Bar chart requires a numeric Y-axis field")
             
-            plot_df = df.sort_values(y_field, ascending=False)
-            fig = px.bar(
-                plot_df, x=x_field, y=y_field, color=color_col,
-                color_discrete_map=color_map,
-                title=f"{y_display} by {x_display}",
-                labels={x_field: x_display, y_field: y_display}
-            )
+            top_n = top_n or (BAR_TOP_N if len(df) > BAR_MAX_ROWS else 0)
+            if top_n:
+                fig = create_top_n_bar(
+                    df, x_field, y_field, color_col, color_map, top_n,
+                    title=f"{y_display} by {x_display}: Top {top_n} + Other",
+                    labels={x_field: x_display, y_field: y_display}
+                )
+            else:
+                plot_df = df.sort_values(y_field, ascending=False)
+                fig = px.bar(
+                    plot_df, x=x_field, y=y_field, color=color_col,
+                    color_discrete_map=color_map,
+                    title=f"{y_display} by {x_display}",
+                    labels={x_field: x_display, y_field: y_display}
+                )
             
         elif chart_type == "Scatter Plot":
             if x_field not in NUMERIC_FIELDS or y_field not in NUMERIC_FIELDS:
                 return create_error_chart("Scatter plot requires numeric fields for both X and Y axes.<br>Please select numeric fields like Cost, ROI, Age, etc.")
             
-            trendline_param = None
-            if show_trendline:
-                if x_field == y_field:
-                    return create_error_chart("Trendline cannot be shown when X and Y are the same field.<br>Please select different fields for X and Y axes.")
-                
-                try:
-                    import statsmodels.api as sm
-                    trendline_param = "ols"
-                except ImportError:
-                    return create_error_chart("Trendline requires the 'statsmodels' package.<br>Run: pip install statsmodels")
+            method = trendline_method(show_trendline)
+            frontier = frontier_mode(show_frontier)
+            if method and x_field == y_field:
+                return create_error_chart("Trendline cannot be shown when X and Y are the same field.<br>Please select different fields for X and Y axes.")
+            
+            if len(df) > SCATTER_DENSITY_ROWS:
+                fig = create_density_scatter(
+                    df, x_field, y_field, color_col, color_map, method,
+                    title=f"{y_display} vs {x_display}",
+                    labels={x_field: x_display, y_field: y_display}
+                )
+                if frontier:
+                    add_frontier(fig, df, x_field, y_field, frontier, x_display, y_display)
+                apply_dark_theme(fig)
+                return fig
             
             fig = px.scatter(
                 df, x=x_field, y=y_field, color=color_col,
                 color_discrete_map=color_map,
                 title=f"{y_display} vs {x_display}",
-                trendline=trendline_param,
+                render_mode="webgl" if len(df) > SCATTER_WEBGL_ROWS else "svg",
                 labels={x_field: x_display, y_field: y_display}
             )
+            if method:
+                colors = {trace.name: trace.marker.color for trace in fig.data}
+                add_trendlines(fig, df, x_field, y_field, color_col, method, colors, x_display, y_display)
+            if frontier:
+                add_frontier(fig, df, x_field, y_field, frontier, x_display, y_display, webgl=len(df) > SCATTER_WEBGL_ROWS)
             
         elif chart_type == "Box Plot":
             if x_field not in CATEGORICAL_FIELDS or y_field not in NUMERIC_FIELDS:
                 return create_error_chart("Box plot requires:<br>• X-axis: Categorical field (Department, Category, Priority, or Equipment Name)<br>• Y-axis: Numeric field (Cost, ROI, Value Score, etc.)")
             
-            fig = px.box(
-                df, x=x_field, y=y_field, color=color_col,
-                color_discrete_map=color_map,
+            fig = create_box_summary(
+                df, x_field, y_field, color_col, color_map,
                 title=f"{y_display} Distribution by {x_display}",
                 labels={x_field: x_display, y_field: y_display}
             )
             
+        elif chart_type == "Risk Bands":
+            if y_field not in SIMULATED_FIELDS:
+                return create_error_chart("Risk bands require a simulated Y-axis field:<br>Net Value or Value Score")
+            
+            fig = create_risk_bands(
+                df, y_field, color_col, color_map,
+                title=f"Simulated {y_display}: P5 / P50 / P95",
+                labels={y_field: y_display}
+            )
+            
+        elif chart_type == "Tornado":
+            if y_field not in SENSITIVITY_METRICS:
+                return create_error_chart("Tornado chart requires a portfolio metric on the Y-axis:<br>Net Value, Lifetime Return, Total Ownership Cost, or Value Score")
+            
+            fig = create_tornado(df, y_field, title=f"Sensitivity of Portfolio {y_display}", labels={y_field: y_display})
+            
+        elif chart_type == "Cash Flow":
+            if y_field not in CASH_FLOW_FIELDS:
+                return create_error_chart("Cash flow chart requires Net Value (nominal) or Net Present Value (discounted) on the Y-axis")
+            
+            fig = create_cash_flow(df, discounted=y_field == "npv", title="Portfolio Cash Flow by Year")
+            
         elif chart_type == "Histogram":
             if x_field not in NUMERIC_FIELDS:
                 return create_error_chart("Histogram requires a numeric X-axis field.<br>Please select fields like Cost, ROI, Age, Value Score, etc.")
             
-            fig = px.histogram(
-                df, x=x_field, color=color_col,
-                color_discrete_map=color_map, nbins=15,
+            fig = create_binned_histogram(
+                df, x_field, color_col, color_map, nbins=15,
                 title=f"Distribution of {x_display}",
                 labels={x_field: x_display}
             )
@@ -123,48 +257,548 @@ def create_chart(df, chart_type, x_field, y_field, color_field, show_trendline=F
         return create_error_chart(f"Error: {str(e)}")
 
 
-def create_error_chart(message):
-    """Create an error message chart."""
+def fit_trendlines(df, x_field, y_field, color_col, method):
+    """Fit trendlines for a selection, reusing fits cached for the same selection and fields."""
+    version = object_memo(df, 'dataset_version', lambda: get_versioned_base_data()[0])
+    key = (version, selection_fingerprint(df), x_field, y_field, color_col, method)
+    
+    def compute():
+        data = df[[x_field, y_field]].to_numpy(dtype=float)
+        codes, groups = _color_groups(df, color_col)
+        valid = ~np.isnan(data).any(axis=1) & (codes >= 0)
+        return compute_trendlines(data[valid, 0], data[valid, 1], codes[valid], groups, method)
+    
+    return TRENDLINE_CACHE.get_or_compute(key, compute)
+
+
+def _with_alpha(color, alpha):
+    """Return an rgba() string for a #rrggbb color."""
+    color = color.lstrip('#')
+    r, g, b = (int(color[i:i + 2], 16) for i in (0, 2, 4))
+    return f"rgba({r}, {g}, {b}, {alpha})"
+
+
+def add_trendlines(fig, df, x_field, y_field, color_col, method, colors, x_display, y_display, show_legend=False):
+    """Add fitted trendline traces (and confidence bands) for every color group."""
+    method_names = {"ols": "OLS", "ols_ci": "OLS", "lowess": "LOWESS", "rolling": "Rolling mean"}
+    for line in fit_trendlines(df, x_field, y_field, color_col, method):
+        group = line['group']
+        name = str(group) if group is not None else ""
+        color = colors.get(name) or colors.get(group) or COLORS['accent_orange']
+        if not isinstance(color, str) or not color.startswith('#'):
+            color = COLORS['accent_orange']
+        
+        hover = f"<b>{method_names[method]} trendline</b>"
+        if group is not None:
+            hover += f"<br>{color_col}={group}"
+        stats = line.get('stats')
+        if stats:
+            hover += (
+                f"<br>{y_display} = {stats['slope']:.4g} * {x_display} + {stats['intercept']:.4g}"
+                f"<br>Slope: {stats['slope']:.4g}<br>R<sup>2</sup>={stats['r2']:.4f}"
+            )
+        hover += f"<br><br>{x_display}=%{{x}}<br>{y_display}=%{{y}} <b>(trend)</b><extra></extra>"
+        
+        if 'lower' in line:
+            fig.add_trace(go.Scatter(
+                x=line['x'], y=line['upper'], mode="lines", line=dict(width=0),
+                legendgroup=name, showlegend=False, hoverinfo="skip"
+            ))
+            fig.add_trace(go.Scatter(
+                x=line['x'], y=line['lower'], mode="lines", line=dict(width=0),
+                fill="tonexty", fillcolor=_with_alpha(color, 0.15),
+                legendgroup=name, showlegend=False, hoverinfo="skip"
+            ))
+        fig.add_trace(go.Scatter(
+            x=line['x'], y=line['y'], mode="lines", name=f"{name} trend".strip() if show_legend else name,
+            legendgroup=name, showlegend=show_legend,
+            line=dict(color=color, width=2), hovertemplate=hover
+        ))
+
+
+def pareto_frontier(df, fields):
+    """Return positions of the rows on the Pareto frontier, reusing results cached for the same selection."""
+    version = object_memo(df, 'dataset_version', lambda: get_versioned_base_data()[0])
+    key = (version, selection_fingerprint(df), tuple(fields))
+    return FRONTIER_CACHE.get_or_compute(key, lambda: frontier_rows(df, fields))
+
+
+def add_frontier(fig, df, x_field, y_field, mode, x_display, y_display, webgl=False):
+    """Overlay the Pareto frontier of the x/y fields, or the items non-dominated across PARETO_FIELDS."""
+    fields = [x_field, y_field] if mode == "xy" else PARETO_FIELDS
+    points = df.take(pareto_frontier(df, fields))
+    x = points[x_field].to_numpy(dtype=float)
+    y = points[y_field].to_numpy(dtype=float)
+    names = points['upgrade_name'].astype(str).to_numpy() if 'upgrade_name' in points.columns else None
+    hover = f"<b>%{{customdata}}</b><br>{x_display}=%{{x}}<br>{y_display}=%{{y}}<extra></extra>"
+    trace = go.Scattergl if webgl else go.Scatter
+    
+    if mode == "xy":
+        order = np.lexsort((y, x))
+        # The staircase steps along x first when lower x is better
+        shape = "hv" if OBJECTIVE_DIRECTIONS[x_field] == "min" else "vh"
+        fig.add_trace(trace(
+            x=x[order], y=y[order], customdata=names[order] if names is not None else None,
+            mode="lines+markers", name=f"Pareto frontier ({len(order)})",
+            line=dict(color=COLORS['accent_orange'], width=2, shape=shape),
+            marker=dict(color=COLORS['accent_orange'], size=8, symbol="diamond"),
+            hovertemplate=hover
+        ))
+    else:
+        fig.add_trace(trace(
+            x=x, y=y, customdata=names, mode="markers",
+            name=f"Pareto set ({len(x)})",
+            marker=dict(color=COLORS['accent_orange'], size=10, symbol="diamond-open", line=dict(width=2)),
+            hovertemplate=hover
+        ))
+
+
+def create_density_scatter(df, x_field, y_field, color_col, color_map, method, title, labels):
+    """Create a scatter plot as a server-side density grid for very large selections."""
+    data = df[[x_field, y_field]].to_numpy(dtype=float)
+    valid = ~np.isnan(data).any(axis=1)
+    x, y = data[valid, 0], data[valid, 1]
+    
+    # Hover lists the best items of each cell by value score
+    scores = df['value_score'].to_numpy(dtype=float)[valid] if 'value_score' in df.columns else None
+    grid = density_grid(x, y, SCATTER_DENSITY_BINS, scores, SCATTER_DENSITY_TOP_ITEMS)
+    
+    counts = grid['counts']
+    hover = np.full(counts.shape, "", dtype=object)
+    if 'upgrade_name' in df.columns and grid['top_rows']:
+        # Only the names shown in hover are pulled out of the frame
+        positions = np.flatnonzero(valid)
+        top = np.concatenate([rows for _, _, rows in grid['top_rows']])
+        names = iter(df['upgrade_name'].take(positions[top]).astype(str).tolist())
+        for y_bin, x_bin, rows in grid['top_rows']:
+            hover[y_bin, x_bin] = "<br>".join(next(names) for _ in rows)
+    
+    x_edges, y_edges = grid['x_edges'], grid['y_edges']
+    fig = go.Figure(go.Heatmap(
+        z=np.where(counts > 0, counts, np.nan),
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        text=hover,
+        colorscale=[[0, COLORS['panel_light']], [0.5, COLORS['accent_blue']], [1, COLORS['accent_green']]],
+        colorbar=dict(title="Items"),
+        hovertemplate=(
+            f"{labels[x_field]}: %{{x:.3g}}<br>{labels[y_field]}: %{{y:.3g}}<br>"
+            "Items: %{z}<br>%{text}<extra></extra>"
+        ),
+        name="Density"
+    ))
+    
+    # Trendlines are fitted on every point, not on the grid
+    if method:
+        add_trendlines(
+            fig, df, x_field, y_field, color_col, method,
+            color_map or {}, labels[x_field], labels[y_field], show_legend=True
+        )
+    
+    fig.update_layout(
+        title=f"{title} (density of {len(x):,} items)",
+        xaxis_title=labels[x_field],
+        yaxis_title=labels[y_field]
+    )
+    return fig
+
+
+def _color_groups(df, color_col):
+    """Return (group codes, group values) for every row, in order of appearance; missing values get code -1."""
+    if not color_col:
+        return np.zeros(len(df), dtype=np.int64), [None]
+    codes, uniques = pd.factorize(df[color_col])
+    return codes, list(uniques)
+
+
+def create_binned_histogram(df, x_field, color_col, color_map, nbins, title, labels):
+    """Create a stacked histogram from bins counted server-side."""
+    values = df[x_field].to_numpy(dtype=float)
+    codes, groups = _color_groups(df, color_col)
+    # Rows with a missing color value are dropped, as px does
+    valid = ~np.isnan(values) & (codes >= 0)
+    values, codes = values[valid], codes[valid]
+    
+    edges = nice_bin_edges(values, nbins)
+    counts = grouped_histogram(values, codes, len(groups), edges)
+    centers = (edges[:-1] + edges[1:]) / 2
+    bin_ranges = np.column_stack((edges[:-1], edges[1:]))
+    
+    fig = go.Figure()
+    for group, group_counts in zip(groups, counts):
+        prefix = f"{color_col}={group}<br>" if group is not None else ""
+        fig.add_trace(go.Bar(
+            x=centers, y=group_counts, width=edges[1] - edges[0],
+            name=str(group) if group is not None else "",
+            marker_color=(color_map or {}).get(group),
+            customdata=bin_ranges,
+            hovertemplate=f"{prefix}{labels[x_field]}=%{{customdata[0]:.4g}} - %{{customdata[1]:.4g}}<br>count=%{{y}}<extra></extra>",
+            showlegend=group is not None
+        ))
+    
+    fig.update_layout(
+        title=title, barmode="relative", bargap=0,
+        xaxis_title=labels[x_field], yaxis_title="count",
+        legend_title_text=color_col or None
+    )
+    return fig
+
+
+def create_box_summary(df, x_field, y_field, color_col, color_map, title, labels):
+    """Create box plots from quartiles, fences, and outliers computed server-side."""
+    values = df[y_field].to_numpy(dtype=float)
+    x_codes, x_values = pd.factorize(df[x_field])
+    color_codes, groups = _color_groups(df, color_col)
+    # A -1 code would land in a neighbouring cell, so rows missing a category are dropped
+    valid = ~np.isnan(values) & (x_codes >= 0) & (color_codes >= 0)
+    values, x_codes, color_codes = values[valid], x_codes[valid], color_codes[valid]
+    n_x = len(x_values)
+    stats = grouped_box_stats(values, color_codes * n_x + x_codes, len(groups) * n_x, BOX_MAX_OUTLIERS)
+    
+    fig = go.Figure()
+    for g, group in enumerate(groups):
+        cells = np.arange(g * n_x, (g + 1) * n_x)
+        cells = cells[stats['count'][cells] > 0]
+        if len(cells) == 0:
+            continue
+        name = str(group) if group is not None else ""
+        color = (color_map or {}).get(group)
+        fig.add_trace(go.Box(
+            x=[x_values[c % n_x] for c in cells],
+            q1=stats['q1'][cells], median=stats['median'][cells], q3=stats['q3'][cells],
+            lowerfence=stats['lowerfence'][cells], upperfence=stats['upperfence'][cells],
+            name=name, legendgroup=name, offsetgroup=name, alignmentgroup=True,
+            marker_color=color, boxpoints=False, showlegend=group is not None
+        ))
+        
+        outlier_x = [x_values[c % n_x] for c in cells for _ in range(len(stats['outliers'][c]))]
+        if outlier_x:
+            fig.add_trace(go.Scatter(
+                x=outlier_x, y=np.concatenate([stats['outliers'][c] for c in cells]),
+                mode="markers", name=name, legendgroup=name, offsetgroup=name, alignmentgroup=True,
+                marker=dict(color=color, size=5), showlegend=False,
+                hovertemplate=f"{labels[x_field]}=%{{x}}<br>{labels[y_field]}=%{{y}}<extra>{name}</extra>"
+            ))
+    
+    fig.update_layout(
+        title=title, boxmode="group", scattermode="group",
+        xaxis_title=labels[x_field], yaxis_title=labels[y_field],
+        legend_title_text=color_col or None
+    )
+    return fig
+
+
+def simulate_selection(df):
+    """Run the risk simulation for a selection, reusing results cached for the same selection."""
+    version = object_memo(df, 'dataset_version', lambda: get_versioned_base_data()[0])
+    key = (version, selection_fingerprint(df), SIMULATION_SCENARIOS, SIMULATION_SEED, SIMULATION_MAX_DRAWS)
+    return SIMULATION_CACHE.get_or_compute(
+        key, lambda: simulate_portfolio(df, SIMULATION_SCENARIOS, SIMULATION_SEED, max_draws=SIMULATION_MAX_DRAWS)
+    )
+
+
+def format_band_value(field, value):
+    """Format a simulated value of a field for display."""
+    return f"{value:.3f}" if field == 'value_score' else format_currency(value)
+
+
+def create_risk_bands(df, y_field, color_col, color_map, title, labels):
+    """Plot the P5-P95 band around the P50 of the items with the highest simulated P50."""
+    result = simulate_selection(df)
+    bands = result['items'][[f"{y_field}_p5", f"{y_field}_p50", f"{y_field}_p95"]].to_numpy()
+    top = np.argsort(-np.nan_to_num(bands[:, 1], nan=-np.inf), kind='stable')[:SIMULATION_CHART_ITEMS]
+    top = top[~np.isnan(bands[top, 1])]
+    bands = bands[top]
+    items = df.take(top)
+    names = (items['upgrade_name'].astype(str) + " (" + items['upgrade_id'].astype(str) + ")").tolist()
+    groups = items[color_col].astype(str).to_numpy() if color_col else np.full(len(top), "")
+    
+    fig = go.Figure()
+    for group in dict.fromkeys(groups):
+        members = np.flatnonzero(groups == group)
+        p5, p50, p95 = bands[members].T
+        fig.add_trace(go.Scatter(
+            x=[names[i] for i in members], y=p50, mode="markers", name=group,
+            marker=dict(size=10, color=(color_map or {}).get(group, COLORS['accent_blue'])),
+            error_y=dict(type="data", symmetric=False, array=p95 - p50, arrayminus=p50 - p5, thickness=2, width=4),
+            customdata=np.column_stack((p5, p95)),
+            hovertemplate=(
+                f"<b>%{{x}}</b><br>{labels[y_field]} P50=%{{y:.4g}}"
+                "<br>P5=%{customdata[0]:.4g}<br>P95=%{customdata[1]:.4g}<extra></extra>"
+            ),
+            showlegend=bool(color_col)
+        ))
+    
+    p5, p50, p95 = result['portfolio'][y_field]
+    subtitle = (
+        f"Portfolio P5 {format_band_value(y_field, p5)} · P50 {format_band_value(y_field, p50)} · "
+        f"P95 {format_band_value(y_field, p95)} ({result['scenarios']:,} scenarios, top {len(top)} items"
+        + (f" of the {result['simulated']:,} costliest simulated" if result['simulated'] < result['valid_items'] else "")
+        + ")"
+    )
+    fig.update_layout(
+        title=f"{title}<br><sup>{subtitle}</sup>",
+        xaxis=dict(categoryorder="array", categoryarray=names, tickangle=-45),
+        yaxis_title=labels[y_field],
+        legend_title_text=color_col or None
+    )
+    return fig
+
+
+def create_top_n_bar(df, x_field, y_field, color_col, color_map, top_n, title, labels):
+    """Plot the y totals of the top N x values, stacked by color, with the rest summed into one "Other" bar."""
+    values = df[y_field].to_numpy(dtype=float)
+    x_codes, x_values = pd.factorize(df[x_field])
+    top, slots, folded = top_n_groups(x_codes, values, len(x_values), top_n)
+    names = [str(x_values[group]) for group in top]
+    if folded:
+        names.append(f"Other ({folded:,} more)")
+    
+    if color_col:
+        color_codes, groups = pd.factorize(df[color_col])
+    else:
+        color_codes, groups = np.zeros(len(df), dtype=np.int64), [""]
+    
+    # (bar, color group) totals in one bincount; rows missing x, color, or y are left out
+    valid = (x_codes >= 0) & (color_codes >= 0) & ~np.isnan(values)
+    cells = slots[x_codes[valid]] * len(groups) + color_codes[valid]
+    totals = np.bincount(cells, weights=values[valid], minlength=len(names) * len(groups))
+    totals = totals[:len(names) * len(groups)].reshape(len(names), len(groups))
+    
     fig = go.Figure()
+    for g, group in enumerate(groups):
+        fig.add_trace(go.Bar(
+            x=names, y=totals[:, g], name=str(group),
+            marker_color=(color_map or {}).get(group, COLORS['accent_blue']),
+            hovertemplate=f"<b>%{{x}}</b><br>{labels[y_field]}: %{{y:.4g}}<extra>{group}</extra>",
+            showlegend=bool(color_col)
+        ))
+    fig.update_layout(
+        title=title,
+        barmode="relative",
+        xaxis=dict(title=labels[x_field], type="category", categoryorder="array", categoryarray=names),
+        yaxis_title=labels[y_field],
+        legend_title_text=color_col or None
+    )
+    return fig
+
+
+def create_cash_flow(df, discounted, title):
+    """Plot yearly capital, maintenance, and returns of the portfolio with its cumulative net position."""
+    portfolio = project_cash_flows(df)['portfolio']
+    years = portfolio['years']
+    factor = (1.0 + PROJECTION_DISCOUNT_RATE) ** -years.astype(float) if discounted else 1.0
+    
+    fig = go.Figure()
+    for name, values, color in (
+        ("Capital", -portfolio['capital'], COLORS['accent_red']),
+        ("Maintenance", -portfolio['maintenance'], COLORS['accent_orange']),
+        ("Returns", portfolio['returns'], COLORS['accent_green']),
+    ):
+        fig.add_trace(go.Bar(
+            x=years, y=values * factor, name=name, marker_color=color,
+            hovertemplate=f"Year %{{x}}<br>{name}: %{{y:$,.1f}}M<extra></extra>"
+        ))
+    
+    cumulative = portfolio['cumulative_npv'] if discounted else np.cumsum(portfolio['net'])
+    fig.add_trace(go.Scatter(
+        x=years, y=cumulative, mode="lines+markers", name="Cumulative net",
+        line=dict(color=COLORS['accent_blue'], width=2),
+        hovertemplate="Year %{x}<br>Cumulative net: %{y:$,.1f}M<extra></extra>"
+    ))
+    
+    if discounted:
+        subtitle = f"Discounted at {PROJECTION_DISCOUNT_RATE:.1%} · NPV {format_currency(portfolio['npv'])}"
+    else:
+        subtitle = f"Nominal · Net {format_currency(float(portfolio['net'].sum()))}"
+    fig.update_layout(
+        title=f"{title}<br><sup>{subtitle}</sup>",
+        barmode="relative",
+        xaxis_title="Year",
+        yaxis_title="Discounted Cash Flow ($M)" if discounted else "Cash Flow ($M)"
+    )
+    return fig
+
+
+def create_tornado(df, y_field, title, labels):
+    """Create a tornado chart of how a portfolio metric moves at the ends of each input's perturbation grid."""
+    result = run_sensitivity(df)
+    bars = tornado(result, y_field)[::-1]
+    base = result['baseline'][y_field]
+    
+    def describe(bar, offset):
+        name = FIELD_DISPLAY_NAMES.get(bar['parameter'], bar['parameter'])
+        change = f"{offset:+.0%}" if bar['kind'] == "relative" else f"{offset:+g}"
+        return f"{name} {change}"
+    
+    names = [FIELD_DISPLAY_NAMES.get(bar['parameter'], bar['parameter']) for bar in bars]
+    fig = go.Figure()
+    for end, label, color in (("low", "Low input", COLORS['accent_red']), ("high", "High input", COLORS['accent_green'])):
+        fig.add_trace(go.Bar(
+            y=names, x=[bar[end] for bar in bars], base=base, orientation="h",
+            name=label, marker_color=color,
+            customdata=[describe(bar, bar[f"{end}_offset"]) for bar in bars],
+            hovertemplate=f"%{{customdata}}<br>{labels[y_field]}: %{{x:+.4g}} vs baseline<extra></extra>"
+        ))
+    
+    fig.add_vline(x=base, line=dict(color=COLORS['text_secondary'], dash="dash"))
+    fig.update_layout(
+        title=f"{title}<br><sup>Baseline {base:.4g} across {result['items']:,} items</sup>",
+        barmode="overlay",
+        xaxis_title=labels[y_field],
+        yaxis_title=None
+    )
+    return fig
+
+
+def create_chart_cached(df, chart_type, x_field, y_field, color_field, show_trendline=False, show_frontier=False, top_n=0):
+    """Create a chart for a base-data selection, reusing figures already built by any session."""
+    version = object_memo(df, 'dataset_version', lambda: get_versioned_base_data()[0])
+    key = (version, selection_fingerprint(df), chart_type, x_field, y_field, color_field, show_trendline, show_frontier, top_n)
+    
+    payload = FIGURE_CACHE.get(key)
+    if payload is not None:
+        import plotly.io as pio
+        return pio.from_json(payload)
+    
+    fig = create_chart(df, chart_type, x_field, y_field, color_field, show_trendline, show_frontier, top_n)
+    FIGURE_CACHE.put(key, fig.to_json())
+    return fig
+
+
+def create_error_chart(message):
+    """Create an error message chart; the message is also kept in layout.meta (see chart_error)."""
+    fig = go.Figure(layout=dict(meta={'error': message}))
     fig.add_annotation(
         text=message,
         xref="paper", yref="paper",
         x=0.5, y=0.5, showarrow=False,
-        font=dict(size=16, color=COLORS['accent_red'], family="Inter, -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif")
+        font=dict(size=16, color=COLORS['accent_red'], family=FONT_FAMILY)
     )
     apply_dark_theme(fig)
     return fig
 
 
-def apply_dark_theme(fig):
-    """Apply consistent dark theme to plotly figure."""
-    fig.update_layout(
-        template="plotly_dark",
+def chart_error(fig):
+    """Return the message of a chart made by create_error_chart, or None for a real chart."""
+    meta = fig.layout.meta
+    return meta.get('error') if isinstance(meta, dict) else None
+
+
+FONT_FAMILY = "Inter, -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif"
+
+
+@functools.lru_cache(maxsize=None)
+def dark_template():
+    """Build the dark theme once as a template merged over plotly_dark."""
+    import plotly.io as pio
+    
+    template = go.layout.Template(pio.templates["plotly_dark"])
+    template.layout.update(
         paper_bgcolor=COLORS['panel'],
         plot_bgcolor=COLORS['background'],
-        font=dict(color=COLORS['text'], size=13, family="Inter, -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif"),
-        title_font=dict(size=16, color=COLORS['text'], family="Inter, -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif"),
-        margin=dict(l=70, r=40, t=60, b=70),
-        height=550,
+        font=dict(color=COLORS['text'], size=13, family=FONT_FAMILY),
+        title_font=dict(size=16, color=COLORS['text'], family=FONT_FAMILY),
         hoverlabel=dict(
             bgcolor=COLORS['panel_light'],
             font_size=13,
             font_color=COLORS['text'],
-            font_family="Inter, -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif"
+            font_family=FONT_FAMILY
         )
     )
-    fig.update_xaxes(
+    axis_style = dict(
         gridcolor=COLORS['border'], showgrid=True,
         title_font=dict(size=14, color=COLORS['text']),
         tickfont=dict(size=12, color=COLORS['text'])
     )
-    fig.update_yaxes(
-        gridcolor=COLORS['border'], showgrid=True,
-        title_font=dict(size=14, color=COLORS['text']),
-        tickfont=dict(size=12, color=COLORS['text'])
+    template.layout.xaxis.update(axis_style)
+    template.layout.yaxis.update(axis_style)
+    return template
+
+
+@profiled
+def apply_dark_theme(fig):
+    """Apply consistent dark theme to plotly figure."""
+    # Margin and height stay explicit: Plotly Express sets its own margin, and
+    # shinywidgets only keeps a fixed height when the figure itself has one
+    fig.update_layout(
+        template=dark_template(),
+        margin=dict(l=70, r=40, t=60, b=70),
+        height=550
     )
 
 
+@profiled
+def format_table(df, bands=None):
+    """Format the filtered portfolio for the data table, with simulated net value bands if given."""
+    if df.empty:
+        return pd.DataFrame({"Message": ["No items match current filters"]})
+    
+    rows = sort_order(df, 'value_score', descending=True)
+    return format_rows(df.take(rows), bands.take(rows) if bands is not None else None)
+
+
+@profiled
+def query_table(df, sort_by='value_score', descending=True, search_field=None, search_text="",
+                page=0, page_size=TABLE_PAGE_SIZE, bands=None):
+    """Sort, search, and page the filtered portfolio, formatting only the requested page.
+    
+    Pages near the top of a numeric sort are picked with a partial top-k
+    selection; deeper pages and text sorts use a full sort order. Sort orders
+    and search masks are cached per selection, so paging through a large
+    selection only slices and formats one page. Returns a dict with the
+    formatted 'table', the matching 'rows' count, and the clamped 'page',
+    'pages', 'start', and 'stop'; 'error' is set when the search is invalid.
+    """
+    version = object_memo(df, 'dataset_version', lambda: get_versioned_base_data()[0])
+    fingerprint = selection_fingerprint(df)
+    
+    error = None
+    candidates = None
+    search_text = (search_text or "").strip()
+    if search_field and search_text:
+        mask = TABLE_CACHE.get_or_compute(
+            (version, fingerprint, 'search', search_field, search_text),
+            lambda: search_mask(df, search_field, search_text)
+        )
+        if mask is None:
+            error = "Numeric search takes a number with an optional >, >=, <, <=, or = in front"
+        else:
+            candidates = np.flatnonzero(mask)
+    
+    total = len(df) if candidates is None else len(candidates)
+    page, pages, start, stop = page_bounds(total, page, page_size)
+    sort_key = (version, fingerprint, 'sort', sort_by, bool(descending))
+    order = TABLE_CACHE.get(sort_key)
+    if order is None and stop <= total // 8 and is_numeric_column(df, sort_by):
+        values = df[sort_by].to_numpy(dtype=float)
+        if candidates is None:
+            rows = top_k(values, stop, descending)[start:stop]
+        else:
+            rows = candidates[top_k(values[candidates], stop, descending)][start:stop]
+    else:
+        if order is None:
+            order = sort_order(df, sort_by, descending)
+            TABLE_CACHE.put(sort_key, order)
+        if candidates is not None:
+            order = order[mask[order]]
+        rows = order[start:stop]
+    
+    if total == 0:
+        table = pd.DataFrame({"Message": ["No items match current filters"]})
+    else:
+        table = format_rows(df.take(rows), bands.take(rows) if bands is not None else None)
+    return {
+        'table': table,
+        'rows': total,
+        'page': page,
+        'pages': pages,
+        'start': start,
+        'stop': stop,
+        'error': error,
+    }
+
+
 def format_currency(value):
     """Format value as currency in millions."""
     return f"${value:.1f}M"
@@ -179,7 +813,9 @@ def parse_simple_text(text):
         'x_axis': 'department',
         'y_axis': 'cost_m',
         'color_by': 'None',
-        'show_trendline': False
+        'show_trendline': False,
+        'show_frontier': False,
+        'top_n': 0
     }
     
     if 'scatter' in text:
@@ -190,9 +826,33 @@ def parse_simple_text(text):
         config['chart_type'] = 'Histogram'
     elif 'bar' in text:
         config['chart_type'] = 'Bar Chart'
+    elif 'tornado' in text or 'sensitivity' in text:
+        config['chart_type'] = 'Tornado'
+        config['y_axis'] = 'net_value'
+    elif 'cash flow' in text or 'npv' in text or 'present value' in text:
+        config['chart_type'] = 'Cash Flow'
+        config['y_axis'] = 'npv'
+    elif 'risk' in text or 'monte carlo' in text or 'percentile' in text:
+        config['chart_type'] = 'Risk Bands'
+        config['y_axis'] = 'net_value'
     
     if 'trendline' in text or 'trend' in text:
         config['show_trendline'] = True
+    if 'lowess' in text or 'smooth' in text:
+        config['show_trendline'] = 'lowess'
+    elif 'rolling' in text or 'moving average' in text:
+        config['show_trendline'] = 'rolling'
+    elif 'confidence' in text:
+        config['show_trendline'] = 'ols_ci'
+    
+    top = re.search(r'\btop\s+(\d+)', text)
+    if top:
+        config['top_n'] = int(top.group(1))
+    
+    if 'skyline' in text or 'pareto set' in text:
+        config['show_frontier'] = 'skyline'
+    elif 'pareto' in text or 'frontier' in text:
+        config['show_frontier'] = True
     
     if 'cost' in text and 'ownership' not in text:
         if 'x' in text or text.index('cost') < len(text) / 2:
@@ -235,16 +895,26 @@ def parse_simple_text(text):
     return config
 
 
+# Keys of a custom chart configuration
+CHART_CONFIG_KEYS = ['chart_type', 'x_axis', 'y_axis', 'color_by', 'show_trendline', 'show_frontier', 'top_n']
+
+
 def validate_chart_config(config):
-    """Validate chart configuration."""
+    """Validate chart configuration, including whether the fields suit the chart type."""
     errors = []
     
-    valid_charts = ['Bar Chart', 'Scatter Plot', 'Box Plot', 'Histogram']
+    unknown = [key for key in config if key not in CHART_CONFIG_KEYS]
+    if unknown:
+        errors.append(f"Unknown keys: {', '.join(map(str, unknown))}. Must be among: {', '.join(CHART_CONFIG_KEYS)}")
+    
+    valid_charts = ['Bar Chart', 'Scatter Plot', 'Box Plot', 'Histogram', 'Risk Bands', 'Tornado', 'Cash Flow']
     if config.get('chart_type') not in valid_charts:
         errors.append(f"Invalid chart type. Must be one of: {', '.join(valid_charts)}")
     
     all_fields = CATEGORICAL_FIELDS + NUMERIC_FIELDS
-    if config.get('x_axis') and config['x_axis'] not in all_fields:
+    # Tornado and Cash Flow charts have no X field; the dashboard sends "None"
+    x_fields = all_fields + (['None'] if config.get('chart_type') in ('Tornado', 'Cash Flow') else [])
+    if config.get('x_axis') and config['x_axis'] not in x_fields:
         errors.append(f"Invalid x_axis field: {config['x_axis']}")
     if config.get('y_axis') and config['y_axis'] not in all_fields:
         errors.append(f"Invalid y_axis field: {config['y_axis']}")
@@ -253,5 +923,43 @@ def validate_chart_config(config):
     if config.get('color_by') and config['color_by'] not in valid_colors:
         errors.append(f"Invalid color_by. Must be one of: {', '.join(valid_colors)}")
     
+    trendline = config.get('show_trendline', False)
+    if not isinstance(trendline, bool) and trendline not in TRENDLINE_METHODS:
+        errors.append(f"Invalid show_trendline. Must be true, false, or one of: {', '.join(TRENDLINE_METHODS)}")
+    
+    frontier = config.get('show_frontier', False)
+    if not isinstance(frontier, bool) and frontier not in FRONTIER_MODES:
+        errors.append(f"Invalid show_frontier. Must be true, false, or one of: {', '.join(FRONTIER_MODES)}")
+    
+    top_n = config.get('top_n', 0)
+    if isinstance(top_n, bool) or not isinstance(top_n, int) or top_n < 0:
+        errors.append("Invalid top_n. Must be 0 (automatic) or a positive number of bars")
+    
+    if not errors:
+        errors.extend(chart_field_errors(
+            config.get('chart_type', 'Bar Chart'), config.get('x_axis', 'department'),
+            config.get('y_axis', 'cost_m'), trendline_method(trendline)
+        ))
+    
     return errors
 
+
+def chart_field_errors(chart_type, x_field, y_field, method=None):
+    """Return the reasons the x and y fields do not suit a chart type (the checks create_chart makes)."""
+    numeric = ", ".join(NUMERIC_FIELDS)
+    if chart_type == "Bar Chart" and y_field not in NUMERIC_FIELDS:
+        return [f"Bar Chart requires a numeric y_axis: {numeric}"]
+    if chart_type == "Scatter Plot":
+        if x_field not in NUMERIC_FIELDS or y_field not in NUMERIC_FIELDS:
+            return [f"Scatter Plot requires numeric x_axis and y_axis fields: {numeric}"]
+        if method and x_field == y_field:
+            return ["A trendline needs different x_axis and y_axis fields"]
+    if chart_type == "Box Plot" and (x_field not in CATEGORICAL_FIELDS or y_field not in NUMERIC_FIELDS):
+        return [f"Box Plot requires a categorical x_axis ({', '.join(CATEGORICAL_FIELDS)}) and a numeric y_axis"]
+    if chart_type == "Histogram" and x_field not in NUMERIC_FIELDS:
+        return [f"Histogram requires a numeric x_axis: {numeric}"]
+    y_choices = {"Risk Bands": SIMULATED_FIELDS, "Tornado": SENSITIVITY_METRICS, "Cash Flow": CASH_FLOW_FIELDS}
+    if chart_type in y_choices and y_field not in y_choices[chart_type]:
+        return [f"{chart_type} requires y_axis to be one of: {', '.join(y_choices[chart_type])}"]
+    return []
+